@@ -0,0 +1,79 @@
+"""
+bench_cache_backends.py — Compara los dos backends de cache_client de recipe-ms:
+  - http:  recipe-ms → cache-API (recipy-cache) → Redis
+  - redis: recipe-ms → Redis directo (redis.asyncio)
+
+Usa las mismas clases que recipe-ms (app/cache_backends.py), así que mide
+exactamente el camino de código de producción. Con docker compose levantado:
+
+    python prot3_tests/bench_cache_backends.py
+"""
+import os
+import sys
+import time
+import asyncio
+import statistics
+
+# URLs vistas desde el host (puertos publicados en docker-compose.yaml)
+os.environ.setdefault("CACHE_API_URL", "http://localhost:8001")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "recipe-ms")))
+from app.cache_backends import HttpCacheBackend, RedisCacheBackend  # noqa: E402
+
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", 2000))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", 20))
+KEY = "bench:feed"
+
+# Payload parecido a una página de feed: 100 recetas con sus pasos
+PAYLOAD = [
+    {
+        "id": f"{i:024x}",
+        "user_id": str(i % 7),
+        "title": f"Receta de prueba {i}",
+        "description": "Descripción de ejemplo " * 4,
+        "prep_time": "30 min",
+        "portions": 4,
+        "steps": [f"Paso {n}: mezclar los ingredientes con cuidado." for n in range(8)],
+        "images": [f"img_{i}_1.jpg", f"img_{i}_2.jpg"],
+        "video": None,
+    }
+    for i in range(100)
+]
+
+
+async def run(name, backend):
+    await backend.set(KEY, PAYLOAD, 300)
+    latencies = []
+    sem = asyncio.Semaphore(CONCURRENCY)
+
+    async def one():
+        async with sem:
+            start = time.perf_counter()
+            value, _ = await backend.get(KEY)
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert len(value) == len(PAYLOAD)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(ITERATIONS)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{name:6s} {ITERATIONS / elapsed:9.0f} req/s  "
+        f"media {statistics.mean(latencies):7.2f} ms  "
+        f"p50 {p50:7.2f} ms  p99 {p99:7.2f} ms"
+    )
+    await backend.delete([KEY])
+
+
+async def main():
+    print(f"🚀 GET de una página de feed ({ITERATIONS} peticiones, concurrencia {CONCURRENCY})\n")
+    await run("http", HttpCacheBackend())
+    await run("redis", RedisCacheBackend())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""
+bench_pgrst_session.py — Latencia de la consulta a PostgREST que hace /login
+en userauth-ms (users?username=eq.<u>), antes y después de la sesión compartida:
+  - antes:   requests.request por llamada (conexión TCP nueva cada vez)
+  - después: app.pg() de userauth-ms (requests.Session con pool keep-alive)
+
+Con docker compose levantado:
+
+    python prot3_tests/bench_pgrst_session.py
+
+Si además se definen BENCH_USER y BENCH_PASSWORD, mide también POST /login
+de extremo a extremo contra userauth-ms (USERAUTH_URL).
+"""
+import os
+import sys
+import time
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# URLs vistas desde el host (puertos publicados en docker-compose.yaml)
+os.environ.setdefault("PGRST_URL_LOCAL", "http://localhost:3001")
+USERAUTH_URL = os.getenv("USERAUTH_URL", "http://localhost:5000")
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "userauth-ms")))
+from app import PGRST, pg  # noqa: E402
+
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", 500))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", 8))
+USERNAME = os.getenv("BENCH_USER", "fixtureuser")
+PASSWORD = os.getenv("BENCH_PASSWORD")
+LOOKUP = f"users?username=eq.{USERNAME}"
+ACCEPT = {"Accept": "application/json"}
+
+
+def bare_lookup():
+    return requests.request("GET", f"{PGRST}/{LOOKUP}", headers=ACCEPT)
+
+
+def pooled_lookup():
+    return pg(LOOKUP, headers=ACCEPT)
+
+
+def run(name, call):
+    call()  # calentamiento: resolución DNS y primera conexión
+    latencies = []
+
+    def one(_):
+        start = time.perf_counter()
+        r = call()
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert r.status_code == 200, r.text
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(CONCURRENCY) as pool:
+        list(pool.map(one, range(ITERATIONS)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{name:8s} {ITERATIONS / elapsed:9.0f} req/s  "
+        f"media {statistics.mean(latencies):7.2f} ms  "
+        f"p50 {p50:7.2f} ms  p99 {p99:7.2f} ms"
+    )
+
+
+def main():
+    print(f"🚀 Consulta de /login a PostgREST ({ITERATIONS} peticiones, concurrencia {CONCURRENCY})\n")
+    run("antes", bare_lookup)
+    run("después", pooled_lookup)
+
+    if PASSWORD:
+        print(f"\n🚀 POST /login de extremo a extremo contra {USERAUTH_URL}\n")
+        session = requests.Session()
+        creds = {"username": USERNAME, "password": PASSWORD}
+        run("login", lambda: session.post(f"{USERAUTH_URL}/login", json=creds))
+
+
+if __name__ == "__main__":
+    main()
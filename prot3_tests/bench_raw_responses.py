@@ -0,0 +1,145 @@
+"""
+bench_raw_responses.py — CPU por petición de un HIT de cache en recipe-ms,
+antes y después de cachear la respuesta ya serializada:
+  - antes:   decode + json.loads del valor → modelos → validación y
+             serialización de response_model (y en recipy-cache, GET
+             /cache/{key} parseaba el valor para volver a serializarlo)
+  - después: bytes guardados → Response tal cual (GET /cache/raw/{key})
+
+No necesita docker: el valor de Redis se simula en memoria con el mismo
+codec, y las peticiones pasan por FastAPI en proceso (httpx ASGITransport),
+así que se mide solo CPU de serialización, sin red ni Redis.
+
+    python prot3_tests/bench_raw_responses.py
+
+Variables: BENCH_ITERATIONS (2000).
+"""
+import os
+import sys
+import time
+import asyncio
+from typing import List
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017/recipy_bench")
+os.environ.setdefault("FEED_CACHE_TTL", "60")
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "recipe-ms")))
+import httpx  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from app.cache_codec import encode, decode, encode_raw, decode_raw  # noqa: E402
+from app.cache_client import CachedResponse  # noqa: E402
+from app.main import RECIPE_JSON, cached_json, render_json, render_page  # noqa: E402
+from app.schema import Recipe, RecipeSummary  # noqa: E402
+
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", 2000))
+
+
+def summary(i):
+    return {
+        "id": f"{i:024x}",
+        "user_id": str(i % 7),
+        "title": f"Receta de prueba {i}",
+        "description": "Descripción de ejemplo " * 4,
+        "images": [f"img_{i}_1.jpg"],
+        "prep_time": "30 min",
+        "portions": 4,
+        "likes_count": i,
+    }
+
+
+DETAIL = {
+    **summary(0),
+    "images": [f"img_0_{n}.jpg" for n in range(4)],
+    "video": None,
+    "steps": [f"Paso {n}: mezclar los ingredientes con cuidado." for n in range(12)],
+}
+
+# (nombre, valor cacheado, response_model, modelos del valor, CachedResponse)
+CASES = [
+    (
+        f"feed {n}", [summary(i) for i in range(n)], List[RecipeSummary],
+        lambda v: [RecipeSummary(**r) for r in v],
+        lambda v, n=n: render_page(v, n),
+    )
+    for n in (20, 100)
+] + [
+    ("detalle", DETAIL, Recipe, lambda v: Recipe(**v), lambda v: render_json(RECIPE_JSON, Recipe(**v))),
+]
+
+
+def before_route(stored, to_models):
+    # El header X-Next-Cursor del "antes" se omite: no cambia el coste
+    async def before():
+        value, _ = decode(stored)
+        return to_models(value)
+    return before
+
+
+def after_route(stored_raw):
+    async def after(request: Request):
+        data, _ = decode_raw(stored_raw)
+        return cached_json(request, CachedResponse.unpack(data), "HIT")
+    return after
+
+
+def build_app():
+    app = FastAPI()
+    for name, value, model, to_models, render in CASES:
+        slug = name.replace(" ", "_")
+        stored_raw = encode_raw(render(value).pack())
+        app.get(f"/antes/{slug}", response_model=model)(before_route(encode(value), to_models))
+        app.get(f"/despues/{slug}", response_model=model)(after_route(stored_raw))
+    return app
+
+
+def cpu_us(fn):
+    """CPU media (µs) de fn() sobre ITERATIONS llamadas."""
+    fn()
+    start = time.process_time()
+    for _ in range(ITERATIONS):
+        fn()
+    return (time.process_time() - start) / ITERATIONS * 1e6
+
+
+async def cpu_us_async(fn):
+    await fn()
+    start = time.process_time()
+    for _ in range(ITERATIONS):
+        await fn()
+    return (time.process_time() - start) / ITERATIONS * 1e6
+
+
+def report(name, before, after):
+    print(f"{name:10s} antes {before:8.1f} µs   después {after:8.1f} µs   ({before / after:4.1f}x)")
+
+
+async def main():
+    print(f"🚀 recipy-cache: GET de un valor cacheado ({ITERATIONS} iteraciones)\n")
+    for name, value, _, _, render in CASES:
+        stored = encode(value)
+        stored_raw = encode_raw(render(value).pack())
+        report(
+            name,
+            cpu_us(lambda: JSONResponse(jsonable_encoder(decode(stored)[0])).body),
+            cpu_us(lambda: decode_raw(stored_raw)[0]),
+        )
+
+    print("\n🚀 recipe-ms: HIT de punta a punta en FastAPI (cliente ASGI incluido)\n")
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, *_ in CASES:
+            slug = name.replace(" ", "_")
+            a = await client.get(f"/antes/{slug}")
+            b = await client.get(f"/despues/{slug}")
+            assert a.json() == b.json(), name
+            report(
+                name,
+                await cpu_us_async(lambda: client.get(f"/antes/{slug}")),
+                await cpu_us_async(lambda: client.get(f"/despues/{slug}")),
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
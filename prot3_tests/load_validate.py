@@ -0,0 +1,86 @@
+"""
+load_validate.py — Prueba de carga de GET /validate en userauth-ms.
+
+Hace login una vez y lanza /validate a ritmo constante (carga abierta: las
+peticiones salen a su hora aunque las anteriores no hayan terminado, y la
+latencia se mide desde la hora prevista, así que las colas cuentan). Al
+final compara el p99 con el objetivo y sale con código 1 si no se cumple.
+
+Con docker compose levantado y un usuario registrado:
+
+    BENCH_USER=fixtureuser BENCH_PASSWORD=pass123 python prot3_tests/load_validate.py
+
+El objetivo de 2000 req/s supone userauth-ms detrás de un servidor WSGI de
+producción (p.ej. gunicorn -w 4 --threads 8 app:app); el servidor de
+desarrollo de Flask (python app.py) se queda muy por debajo.
+
+Variables: USERAUTH_URL, LOAD_RPS (2000), LOAD_SECONDS (30),
+LOAD_P99_MS (objetivo de p99, 50), LOAD_MAX_CONNECTIONS (200).
+"""
+import os
+import sys
+import time
+import asyncio
+import statistics
+
+import httpx
+
+USERAUTH_URL = os.getenv("USERAUTH_URL", "http://localhost:5000")
+USERNAME = os.getenv("BENCH_USER", "fixtureuser")
+PASSWORD = os.getenv("BENCH_PASSWORD", "pass123")
+RPS = int(os.getenv("LOAD_RPS", 2000))
+SECONDS = float(os.getenv("LOAD_SECONDS", 30))
+P99_TARGET_MS = float(os.getenv("LOAD_P99_MS", 50))
+MAX_CONNECTIONS = int(os.getenv("LOAD_MAX_CONNECTIONS", 200))
+
+
+async def main():
+    limits = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+    async with httpx.AsyncClient(base_url=USERAUTH_URL, limits=limits, timeout=10) as client:
+        r = await client.post("/login", json={"username": USERNAME, "password": PASSWORD})
+        r.raise_for_status()
+        headers = {"Authorization": f"Bearer {r.json()['token']}"}
+
+        # calentamiento: abre conexiones y deja el binding en Redis
+        await asyncio.gather(*(client.get("/validate", headers=headers) for _ in range(50)))
+
+        latencies, errors = [], 0
+
+        async def one(scheduled):
+            nonlocal errors
+            try:
+                resp = await client.get("/validate", headers=headers)
+                if resp.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - scheduled) * 1000)
+
+        total = int(RPS * SECONDS)
+        print(f"🚀 GET /validate a {RPS} req/s durante {SECONDS:.0f}s ({total} peticiones)\n")
+        start = time.perf_counter()
+        tasks = []
+        for i in range(total):
+            scheduled = start + i / RPS
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(scheduled)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{total / elapsed:9.0f} req/s  errores {errors}  "
+        f"media {statistics.mean(latencies):7.2f} ms  "
+        f"p50 {p50:7.2f} ms  p99 {p99:7.2f} ms  max {latencies[-1]:7.2f} ms"
+    )
+    ok = p99 <= P99_TARGET_MS and errors == 0
+    print(f"\n{'✅' if ok else '❌'} objetivo p99 <= {P99_TARGET_MS:.0f} ms")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
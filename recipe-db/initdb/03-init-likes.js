@@ -4,8 +4,10 @@ db = db.getSiblingDB('recipy');
 // Crea la colección "likes" si no existe
 db.createCollection('likes');
 
-// Índice para buscar “me gusta” por receta
-db.likes.createIndex({ recipe_id: 1 });
+// Un solo “me gusta” por usuario y receta: el like se hace con un upsert
+// que se apoya en este índice. También sirve para buscar por receta
+// (recipe_id es su prefijo), así que sustituye al índice simple.
+db.likes.createIndex({ recipe_id: 1, user_id: 1 }, { unique: true });
 
 // Índice para buscar “me gusta” por usuario
 db.likes.createIndex({ user_id: 1 });
@@ -0,0 +1,333 @@
+# app/cache_backends.py
+import os
+import json
+import secrets
+import importlib.util
+import httpx
+from urllib.parse import quote
+from typing import Any, Dict, List, Optional, Tuple
+from app.cache_codec import encode, decode, encode_raw, decode_raw, is_raw
+
+CACHE_API = os.getenv("CACHE_API_URL", "http://cache-api:8001")
+REDIS_URL = os.getenv("REDIS_URL")
+INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache:invalidate")
+
+# Pool de conexiones hacia la cache-API
+HTTP_MAX_CONNECTIONS = int(os.getenv("CACHE_HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE = int(os.getenv("CACHE_HTTP_MAX_KEEPALIVE", 50))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("CACHE_HTTP_KEEPALIVE_EXPIRY", 30))
+# Timeouts (segundos): conectar debe ser rápido; leer puede tardar más
+HTTP_CONNECT_TIMEOUT = float(os.getenv("CACHE_HTTP_CONNECT_TIMEOUT", 0.5))
+HTTP_READ_TIMEOUT = float(os.getenv("CACHE_HTTP_READ_TIMEOUT", 3.0))
+HTTP_POOL_TIMEOUT = float(os.getenv("CACHE_HTTP_POOL_TIMEOUT", 1.0))
+# HTTP/2 (multiplexa sobre pocas conexiones). Requiere httpx[http2] y
+# que la cache-API lo hable (uvicorn no; p.ej. detrás de un proxy h2c)
+HTTP2 = os.getenv("CACHE_HTTP2", "false").lower() in ("1", "true", "yes")
+
+# (valor, stale)
+Entry = Tuple[Any, bool]
+# (bytes tal cual se guardaron, stale)
+RawEntry = Tuple[bytes, bool]
+
+
+def _path(key: str) -> str:
+    """
+    Clave como segmento de URL, escapada por completo: sin escapar, un
+    '#' o '?' la cortaría (y se escribiría bajo otra clave) y un '/' o '%'
+    cambiaría la ruta. La cache-API la recibe ya decodificada.
+    """
+    return quote(key, safe="")
+
+
+class HttpCacheBackend:
+    """
+    Habla HTTP+JSON con la cache-API (recipy-cache), que a su vez
+    habla con Redis. Es el modo por defecto.
+
+    El cliente httpx (y su pool de conexiones keep-alive) se crea en
+    start() desde el startup de la app y se cierra en close(). Si se usa
+    sin start() (scripts, benchmarks) se crea en la primera llamada.
+    """
+
+    def __init__(self, base_url: str = CACHE_API):
+        self.base_url = base_url
+        self.client: Optional[httpx.AsyncClient] = None
+
+    async def start(self) -> None:
+        self._http()
+
+    def _http(self) -> httpx.AsyncClient:
+        if self.client is not None:
+            return self.client
+        http2 = HTTP2
+        if http2 and importlib.util.find_spec("h2") is None:
+            print("h2 no instalado: cache_client usa HTTP/1.1")
+            http2 = False
+        self.client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                connect=HTTP_CONNECT_TIMEOUT,
+                read=HTTP_READ_TIMEOUT,
+                write=HTTP_READ_TIMEOUT,
+                pool=HTTP_POOL_TIMEOUT,
+            ),
+        )
+        return self.client
+
+    async def close(self) -> None:
+        """Cierra las conexiones del pool (shutdown de la app)."""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def get(self, key: str) -> Optional[Entry]:
+        resp = await self._http().get(f"{self.base_url}/cache/{_path(key)}")
+        if resp.status_code == 200:
+            return resp.json(), resp.headers.get("X-Cache") == "STALE"
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+
+    async def set(
+        self, key: str, value: Any, ttl: int,
+        stale_ttl: Optional[int] = None, tags: Optional[List[str]] = None
+    ) -> None:
+        payload = {"key": key, "value": value, "ttl": ttl, "stale_ttl": stale_ttl, "tags": tags}
+        resp = await self._http().post(f"{self.base_url}/cache", json=payload)
+        resp.raise_for_status()
+
+    async def get_raw(self, key: str) -> Optional[RawEntry]:
+        resp = await self._http().get(f"{self.base_url}/cache/raw/{_path(key)}")
+        if resp.status_code == 200:
+            return resp.content, resp.headers.get("X-Cache") == "STALE"
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+
+    async def set_raw(
+        self, key: str, data: bytes, ttl: int,
+        stale_ttl: Optional[int] = None, tags: Optional[List[str]] = None
+    ) -> None:
+        params: Dict[str, Any] = {"ttl": ttl}
+        if stale_ttl:
+            params["stale_ttl"] = stale_ttl
+        if tags:
+            params["tags"] = tags
+        resp = await self._http().put(f"{self.base_url}/cache/raw/{_path(key)}", params=params, content=data)
+        resp.raise_for_status()
+
+    async def delete(self, keys: List[str]) -> None:
+        if len(keys) == 1:
+            resp = await self._http().delete(f"{self.base_url}/cache/{_path(keys[0])}")
+            if resp.status_code not in (204, 404):
+                resp.raise_for_status()
+            return
+        resp = await self._http().post(f"{self.base_url}/cache/mdel", json={"keys": keys})
+        resp.raise_for_status()
+
+    async def mget(self, keys: List[str]) -> Dict[str, Entry]:
+        resp = await self._http().post(f"{self.base_url}/cache/mget", json={"keys": keys})
+        resp.raise_for_status()
+        body = resp.json()
+        stale = set(body.get("stale", []))
+        return {k: (v, k in stale) for k, v in body["values"].items()}
+
+    async def mset(self, items: Dict[str, Any], ttl: int, stale_ttl: Optional[int] = None) -> None:
+        payload = {"items": [
+            {"key": k, "value": v, "ttl": ttl, "stale_ttl": stale_ttl}
+            for k, v in items.items()
+        ]}
+        resp = await self._http().post(f"{self.base_url}/cache/mset", json=payload)
+        resp.raise_for_status()
+
+    async def delete_prefix(self, prefix: str) -> None:
+        resp = await self._http().delete(f"{self.base_url}/cache/prefix/{_path(prefix)}")
+        resp.raise_for_status()
+
+    async def invalidate_tags(self, tags: List[str]) -> List[str]:
+        resp = await self._http().post(f"{self.base_url}/cache/invalidate", json={"tags": tags})
+        resp.raise_for_status()
+        return resp.json()["keys"]
+
+    async def lock(self, key: str, ttl_ms: int) -> Optional[str]:
+        resp = await self._http().post(f"{self.base_url}/lock/{_path(key)}", json={"ttl_ms": ttl_ms})
+        if resp.status_code == 409:
+            return None
+        resp.raise_for_status()
+        return resp.json()["token"]
+
+    async def unlock(self, key: str, token: str) -> None:
+        resp = await self._http().delete(f"{self.base_url}/lock/{_path(key)}", params={"token": token})
+        if resp.status_code not in (204, 409):
+            resp.raise_for_status()
+
+
+# Mismos scripts que recipy-cache/app/main.py (lo comprueba tests/test_cache_parity.py)
+# Borra el lock solo si el token coincide
+_UNLOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# SET de la clave + SADD en cada set "tag:{tag}" (que vive al menos tanto
+# como la clave más longeva que contiene)
+_SET_TAGGED_SCRIPT = """
+local ttl = tonumber(ARGV[2])
+redis.call('set', KEYS[1], ARGV[1], 'EX', ttl)
+for i = 2, #KEYS do
+    redis.call('sadd', KEYS[i], KEYS[1])
+    if redis.call('ttl', KEYS[i]) < ttl then
+        redis.call('expire', KEYS[i], ttl)
+    end
+end
+return 1
+"""
+
+# Borra las claves de todas las etiquetas y los propios sets; devuelve las claves
+_INVALIDATE_TAGS_SCRIPT = """
+local keys = {}
+for i = 1, #KEYS do
+    for _, key in ipairs(redis.call('smembers', KEYS[i])) do
+        keys[#keys + 1] = key
+    end
+    redis.call('del', KEYS[i])
+end
+for i = 1, #keys, 1000 do
+    redis.call('unlink', unpack(keys, i, math.min(i + 999, #keys)))
+end
+return keys
+"""
+
+
+class RedisCacheBackend:
+    """
+    Habla directamente con Redis (redis.asyncio), sin pasar por la
+    cache-API: ahorra un salto de red y una serialización JSON por
+    clave. Replica la semántica de recipy-cache/app/main.py (formato de
+    los valores, TTL duro = ttl + stale_ttl, claves lock:{key} y aviso
+    de invalidación por pub/sub, sets tag:{tag}), así que ambos modos
+    pueden convivir.
+    """
+
+    def __init__(self, url: Optional[str] = REDIS_URL):
+        from redis.asyncio import from_url
+
+        if not url:
+            raise RuntimeError("CACHE_BACKEND=redis requiere REDIS_URL")
+        # Sin decode_responses: los valores son bytes (codec con compresión)
+        self.redis = from_url(url)
+
+    async def start(self) -> None:
+        # El pool de redis.asyncio abre conexiones bajo demanda
+        return
+
+    async def close(self) -> None:
+        await self.redis.close()
+        await self.redis.connection_pool.disconnect()
+
+    async def _publish(self, keys: Optional[List[str]] = None, prefix: Optional[str] = None) -> None:
+        message: Dict[str, Any] = {"keys": keys or []}
+        if prefix:
+            message["prefix"] = prefix
+        await self.redis.publish(INVALIDATION_CHANNEL, json.dumps(message))
+
+    @staticmethod
+    def _store_args(value: Any, ttl: int, stale_ttl: Optional[int]) -> Tuple[bytes, int]:
+        if stale_ttl:
+            return encode(value, soft_ttl=ttl), ttl + stale_ttl
+        return encode(value), ttl
+
+    async def _set_payload(self, key: str, payload: bytes, ex: int, tags: Optional[List[str]]) -> None:
+        if not tags:
+            await self.redis.set(key, payload, ex=ex)
+            return
+        tag_keys = [f"tag:{t}" for t in dict.fromkeys(tags)]
+        await self.redis.eval(_SET_TAGGED_SCRIPT, 1 + len(tag_keys), key, *tag_keys, payload, ex)
+
+    async def get(self, key: str) -> Optional[Entry]:
+        raw = await self.redis.get(key)
+        if raw is None or is_raw(raw):
+            return None
+        return decode(raw)
+
+    async def set(
+        self, key: str, value: Any, ttl: int,
+        stale_ttl: Optional[int] = None, tags: Optional[List[str]] = None
+    ) -> None:
+        payload, ex = self._store_args(value, ttl, stale_ttl)
+        await self._set_payload(key, payload, ex, tags)
+
+    async def get_raw(self, key: str) -> Optional[RawEntry]:
+        raw = await self.redis.get(key)
+        if raw is None:
+            return None
+        return decode_raw(raw)
+
+    async def set_raw(
+        self, key: str, data: bytes, ttl: int,
+        stale_ttl: Optional[int] = None, tags: Optional[List[str]] = None
+    ) -> None:
+        if stale_ttl:
+            payload, ex = encode_raw(data, soft_ttl=ttl), ttl + stale_ttl
+        else:
+            payload, ex = encode_raw(data), ttl
+        await self._set_payload(key, payload, ex, tags)
+
+    async def delete(self, keys: List[str]) -> None:
+        await self.redis.delete(*keys)
+        await self._publish(keys=keys)
+
+    async def mget(self, keys: List[str]) -> Dict[str, Entry]:
+        raws = await self.redis.mget(keys)
+        return {k: decode(raw) for k, raw in zip(keys, raws) if raw is not None and not is_raw(raw)}
+
+    async def mset(self, items: Dict[str, Any], ttl: int, stale_ttl: Optional[int] = None) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                payload, ex = self._store_args(value, ttl, stale_ttl)
+                pipe.set(key, payload, ex=ex)
+            await pipe.execute()
+
+    async def delete_prefix(self, prefix: str) -> None:
+        pattern = "".join("\\" + c if c in "*?[]\\" else c for c in prefix) + "*"
+        batch: List[bytes] = []
+        async for key in self.redis.scan_iter(match=pattern, count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                await self.redis.unlink(*batch)
+                batch = []
+        if batch:
+            await self.redis.unlink(*batch)
+        await self._publish(prefix=prefix)
+
+    async def invalidate_tags(self, tags: List[str]) -> List[str]:
+        raw = await self.redis.eval(_INVALIDATE_TAGS_SCRIPT, len(tags), *[f"tag:{t}" for t in tags])
+        keys = list(dict.fromkeys(k.decode() for k in raw))
+        if keys:
+            await self._publish(keys=keys)
+        return keys
+
+    async def lock(self, key: str, ttl_ms: int) -> Optional[str]:
+        token = secrets.token_hex(16)
+        if await self.redis.set(f"lock:{key}", token, nx=True, px=ttl_ms):
+            return token
+        return None
+
+    async def unlock(self, key: str, token: str) -> None:
+        await self.redis.eval(_UNLOCK_SCRIPT, 1, f"lock:{key}", token)
+
+
+def build_backend(name: str):
+    """Backend según CACHE_BACKEND: 'http' (por defecto) o 'redis'."""
+    if name == "redis":
+        return RedisCacheBackend()
+    if name == "http":
+        return HttpCacheBackend()
+    raise ValueError(f"CACHE_BACKEND desconocido: {name!r}")
@@ -1,35 +1,675 @@
 # app/cache_client.py
 import os
-import httpx
-from typing import Any, Optional
+import json
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+from app.cache_backends import build_backend, REDIS_URL, INVALIDATION_CHANNEL
+from app.cache_codec import json_dumps
+from app.metrics import (
+    CACHE_RESULTS, CACHE_L1_RESULTS, CACHE_BACKEND_SECONDS, key_prefix,
+    CACHE_BREAKER_STATE, CACHE_BREAKER_TRANSITIONS, CACHE_BREAKER_SKIPPED
+)
 
-CACHE_API = os.getenv("CACHE_API_URL", "http://cache-api:8001")
-_client = httpx.AsyncClient(timeout=3.0)
+# 'http' (cache-API, por defecto) o 'redis' (Redis directo, sin salto HTTP)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "http").lower()
+_backend = build_backend(CACHE_BACKEND)
 
-async def cache_get(key: str) -> Optional[Any]:
+# -------------------------------------------------------------------------
+# L1: cache en memoria del proceso, delante de la cache-API
+# -------------------------------------------------------------------------
+# Formato: "prefijo=max_entradas:ttl_segundos" separados por coma.
+# Una cadena vacía desactiva el L1.
+L1_CACHE_CONFIG = os.getenv(
+    "L1_CACHE_CONFIG",
+    "recipes:detail:=1024:30,recipes:feed:=64:10"
+)
+# Lock distribuido en recipy-cache para coalescer misses entre réplicas
+DISTRIBUTED_LOCK = os.getenv("CACHE_DISTRIBUTED_LOCK", "false").lower() in ("1", "true", "yes")
+LOCK_TTL_MS = int(os.getenv("CACHE_LOCK_TTL_MS", 5000))
+LOCK_WAIT_MS = int(os.getenv("CACHE_LOCK_WAIT_MS", 2000))
+LOCK_POLL_MS = int(os.getenv("CACHE_LOCK_POLL_MS", 50))
+# Circuit breaker: presupuesto de latencia por llamada a la cache, fallos
+# seguidos que abren el circuito y segundos hasta el sondeo (half-open)
+CACHE_BUDGET_MS = int(os.getenv("CACHE_BUDGET_MS", 250))
+BREAKER_FAILURES = int(os.getenv("CACHE_BREAKER_FAILURES", 5))
+BREAKER_RESET_S = float(os.getenv("CACHE_BREAKER_RESET_S", 10))
+
+
+class LocalCache:
+    """
+    LRU acotado con TTL por entrada. No es thread-safe: solo se usa
+    desde el event loop. Los valores se devuelven tal cual (sin copia),
+    así que los llamadores deben tratarlos como de solo lectura.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def set(self, key: str, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def drop_prefix(self, prefix: str) -> None:
+        for key in [k for k in self._data if k.startswith(prefix)]:
+            del self._data[key]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+def _parse_l1_config(raw: str) -> Dict[str, LocalCache]:
+    tiers: Dict[str, LocalCache] = {}
+    for rule in filter(None, (r.strip() for r in raw.split(","))):
+        prefix, _, limits = rule.rpartition("=")
+        maxsize, _, ttl = limits.partition(":")
+        tiers[prefix] = LocalCache(int(maxsize), float(ttl))
+    return tiers
+
+_l1 = _parse_l1_config(L1_CACHE_CONFIG)
+# Prefijos más largos primero para que gane la regla más específica
+_l1_prefixes = sorted(_l1, key=len, reverse=True)
+
+def _l1_for(key: str) -> Optional[LocalCache]:
+    for prefix in _l1_prefixes:
+        if key.startswith(prefix):
+            return _l1[prefix]
+    return None
+
+def l1_evict(keys: List[str]) -> None:
+    for key in keys:
+        tier = _l1_for(key)
+        if tier is not None:
+            tier.pop(key)
+
+def l1_evict_prefix(prefix: str) -> None:
+    for tier in _l1.values():
+        tier.drop_prefix(prefix)
+
+def l1_clear() -> None:
+    for tier in _l1.values():
+        tier.clear()
+
+
+async def _invalidation_listener() -> None:
     """
-    Llama a GET /cache/{key}.
-    Devuelve el objeto (JSON) o None si 404.
+    Escucha el canal de invalidación de recipy-cache y vacía las claves
+    afectadas del L1 de esta réplica. Si se pierde la conexión se vacía
+    todo el L1 (pudimos perder mensajes) y se reintenta.
     """
-    resp = await _client.get(f"{CACHE_API}/cache/{key}")
-    if resp.status_code == 200:
-        return resp.json()
-    if resp.status_code == 404:
+    from redis.asyncio import from_url
+
+    # Un solo cliente (y pool) para toda la vida del listener: cada
+    # reintento solo abre una conexión pubsub nueva
+    redis = from_url(REDIS_URL, decode_responses=True)
+    try:
+        while True:
+            try:
+                async with redis.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    async for msg in pubsub.listen():
+                        if msg["type"] != "message":
+                            continue
+                        data = json.loads(msg["data"])
+                        l1_evict(data.get("keys", []))
+                        if data.get("prefix"):
+                            l1_evict_prefix(data["prefix"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print("Error en el listener de invalidación L1:", e)
+                l1_clear()
+                await asyncio.sleep(1)
+    finally:
+        await redis.close()
+        await redis.connection_pool.disconnect()
+
+_listener_task: Optional[asyncio.Task] = None
+
+def start_invalidation_listener() -> Optional[asyncio.Task]:
+    """Arranca el listener pub/sub (si hay L1 y REDIS_URL configurados)."""
+    global _listener_task
+    if not _l1:
         return None
-    resp.raise_for_status()
+    if not REDIS_URL:
+        print("REDIS_URL no definido: el L1 solo expira por TTL.")
+        return None
+    if _listener_task is None or _listener_task.done():
+        _listener_task = asyncio.create_task(_invalidation_listener())
+    return _listener_task
+
+# -------------------------------------------------------------------------
+# Cliente de la cache (cache-API por HTTP o Redis directo)
+# -------------------------------------------------------------------------
 
-async def cache_set(key: str, value: Any, ttl: int) -> None:
+async def start_cache_client() -> None:
+    """Abre el pool de conexiones del backend (startup de la app)."""
+    await _backend.start()
+
+async def close_cache_client() -> None:
     """
-    Llama a POST /cache con {key, value, ttl}.
+    Shutdown ordenado: para el listener de invalidación y cierra las
+    conexiones keep-alive del backend.
     """
-    payload = {"key": key, "value": value, "ttl": ttl}
-    resp = await _client.post(f"{CACHE_API}/cache", json=payload)
-    resp.raise_for_status()
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
+    await _backend.close()
+
+class CacheUnavailable(Exception):
+    """La cache falló, superó el presupuesto de latencia o el breaker está abierto."""
+
+
+class CircuitBreaker:
+    """
+    closed → (BREAKER_FAILURES fallos seguidos) → open → (BREAKER_RESET_S)
+    → half_open: pasa una única llamada de sondeo; si va bien se cierra,
+    si falla vuelve a open. Solo se usa desde el event loop.
+    """
+
+    def __init__(self, failures: int, reset_s: float):
+        self.max_failures = failures
+        self.reset_s = reset_s
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        CACHE_BREAKER_STATE.state("closed")
+
+    def _move(self, state: str) -> None:
+        if state != self.state:
+            print(f"Circuit breaker de la cache: {self.state} → {state}")
+            self.state = state
+            CACHE_BREAKER_STATE.state(state)
+            CACHE_BREAKER_TRANSITIONS.labels(state).inc()
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_s:
+                return False
+            self._move("half_open")
+        # half_open: solo una llamada de sondeo a la vez
+        if self.probing:
+            return False
+        self.probing = True
+        return True
+
+    def success(self) -> None:
+        if self.state == "half_open":
+            self.probing = False
+            self._move("closed")
+        if self.state == "closed":
+            self.failures = 0
+
+    def cancelled(self) -> None:
+        # Cancelada (p.ej. la petición que la esperaba se cortó): no dice
+        # nada de la cache, solo libera el sondeo para que pase otra llamada
+        self.probing = False
+
+    def failure(self) -> None:
+        self.probing = False
+        self.failures += 1
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.max_failures):
+            self.opened_at = time.monotonic()
+            self._move("open")
+
+_breaker = CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET_S)
+
+async def _call(operation: str, *args: Any) -> Any:
+    """
+    Llama a _backend.<operation>(*args) con el presupuesto de latencia
+    CACHE_BUDGET_MS, midiendo su latencia y pasando por el breaker.
+    Cualquier fallo se convierte en CacheUnavailable.
+    """
+    if not _breaker.allow():
+        CACHE_BREAKER_SKIPPED.labels(operation).inc()
+        raise CacheUnavailable(f"breaker {_breaker.state}")
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        result = await asyncio.wait_for(
+            getattr(_backend, operation)(*args), CACHE_BUDGET_MS / 1000
+        )
+        outcome = "ok"
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        _breaker.cancelled()
+        raise
+    except asyncio.TimeoutError as e:
+        outcome = "timeout"
+        _breaker.failure()
+        raise CacheUnavailable(f"{operation}: más de {CACHE_BUDGET_MS} ms") from e
+    except Exception as e:
+        _breaker.failure()
+        raise CacheUnavailable(f"{operation}: {e!r}") from e
+    finally:
+        CACHE_BACKEND_SECONDS.labels(operation, outcome).observe(time.perf_counter() - start)
+    _breaker.success()
+    return result
+
+# Las funciones públicas degradan ante CacheUnavailable: las lecturas se
+# tratan como miss (se va directo a Mongo) y las escrituras se omiten. Una
+# invalidación perdida deja la clave hasta su TTL; se registra en el log.
+
+async def cache_get_entry(key: str) -> Tuple[Optional[Any], bool]:
+    """
+    Busca primero en el L1 y si no, en el backend.
+    Devuelve (objeto JSON o None si no existe, stale). 'stale' es True si
+    el valor ya superó su soft TTL (X-Cache: STALE en la cache-API).
+    """
+    tier = _l1_for(key)
+    if tier is not None:
+        found, value = tier.get(key)
+        CACHE_L1_RESULTS.labels(key_prefix(key), "hit" if found else "miss").inc()
+        if found:
+            return value, False
+
+    try:
+        entry = await _call("get", key)
+    except CacheUnavailable:
+        return None, False
+    if entry is None:
+        return None, False
+    value, stale = entry
+    # En el L1 solo guardamos valores frescos
+    if tier is not None and not stale:
+        tier.set(key, value)
+    return value, stale
+
+async def cache_get(key: str) -> Optional[Any]:
+    """
+    Devuelve el objeto (JSON) o None si 404 (fresco o stale, da igual).
+    """
+    value, _ = await cache_get_entry(key)
+    return value
+
+async def cache_set(
+    key: str,
+    value: Any,
+    ttl: int,
+    stale_ttl: Optional[int] = None,
+    tags: Optional[List[str]] = None
+) -> None:
+    """
+    Guarda {key, value, ttl, stale_ttl, tags} en el backend y también en
+    el L1. Con 'tags' la clave se borra en cuanto se invalide cualquiera
+    de sus etiquetas (ver invalidate_tags y app/cache_tags.py).
+    """
+    try:
+        await _call("set", key, value, ttl, stale_ttl, tags)
+    except CacheUnavailable:
+        return
+    tier = _l1_for(key)
+    if tier is not None:
+        tier.set(key, value)
+
+class CachedResponse(NamedTuple):
+    """
+    Respuesta HTTP ya serializada: cuerpo JSON y headers propios de la
+    respuesta (p.ej. X-Next-Cursor). En la cache se guarda como bytes
+    (pack) y en un HIT se sirve tal cual, sin parsear ni validar el cuerpo.
+    """
+    body: bytes
+    headers: Dict[str, str]
+
+    def pack(self) -> bytes:
+        # "<headers JSON>\n<cuerpo>": el JSON de los headers no lleva saltos de línea
+        return json_dumps(self.headers) + b"\n" + self.body
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "CachedResponse":
+        head, _, body = data.partition(b"\n")
+        return cls(body, json.loads(head))
+
+async def cache_get_response_entry(key: str) -> Tuple[Optional[CachedResponse], bool]:
+    """
+    Como cache_get_entry, para respuestas guardadas con cache_set_response.
+    Una clave guardada como valor JSON (formato anterior) cuenta como miss.
+    """
+    tier = _l1_for(key)
+    if tier is not None:
+        found, value = tier.get(key)
+        CACHE_L1_RESULTS.labels(key_prefix(key), "hit" if found else "miss").inc()
+        if found:
+            return value, False
+
+    try:
+        entry = await _call("get_raw", key)
+    except CacheUnavailable:
+        return None, False
+    if entry is None:
+        return None, False
+    data, stale = entry
+    cached = CachedResponse.unpack(data)
+    if tier is not None and not stale:
+        tier.set(key, cached)
+    return cached, stale
+
+async def cache_set_response(
+    key: str,
+    cached: CachedResponse,
+    ttl: int,
+    stale_ttl: Optional[int] = None,
+    tags: Optional[List[str]] = None
+) -> None:
+    """Como cache_set, guardando los bytes de la respuesta tal cual."""
+    try:
+        await _call("set_raw", key, cached.pack(), ttl, stale_ttl, tags)
+    except CacheUnavailable:
+        return
+    tier = _l1_for(key)
+    if tier is not None:
+        tier.set(key, cached)
 
 async def cache_del(key: str) -> None:
     """
-    Llama a DELETE /cache/{key}.
+    Invalida una clave (DELETE /cache/{key} en modo HTTP).
+    """
+    await cache_mdel([key])
+
+async def cache_mget(keys: List[str]) -> Dict[str, Any]:
+    """
+    Lee varias claves en una sola petición (solo las que no estén en el L1).
+    Devuelve {key: valor} solo para las claves presentes en cache.
+    """
+    values: Dict[str, Any] = {}
+    remote: List[str] = []
+    for key in keys:
+        tier = _l1_for(key)
+        found, value = tier.get(key) if tier is not None else (False, None)
+        if found:
+            values[key] = value
+        else:
+            remote.append(key)
+    if not remote:
+        return values
+    try:
+        entries = await _call("mget", remote)
+    except CacheUnavailable:
+        return values
+    for key, (value, stale) in entries.items():
+        tier = _l1_for(key)
+        if tier is not None and not stale:
+            tier.set(key, value)
+        values[key] = value
+    return values
+
+async def cache_mset(items: Dict[str, Any], ttl: int) -> None:
+    """
+    Guarda todos los items en un solo pipeline (POST /cache/mset en modo HTTP).
+    """
+    if not items:
+        return
+    try:
+        await _call("mset", items, ttl)
+    except CacheUnavailable:
+        return
+    for key, value in items.items():
+        tier = _l1_for(key)
+        if tier is not None:
+            tier.set(key, value)
+
+async def cache_mdel(keys: List[str]) -> None:
+    """
+    Invalida varias claves en una sola petición.
+    """
+    if not keys:
+        return
+    l1_evict(keys)
+    try:
+        await _call("delete", keys)
+    except CacheUnavailable as e:
+        print("Invalidación perdida (cache no disponible):", keys, e)
+
+async def cache_del_prefix(prefix: str) -> None:
+    """
+    Borra todas las claves que empiezan por 'prefix' (p.ej. páginas de un feed).
+    """
+    l1_evict_prefix(prefix)
+    try:
+        await _call("delete_prefix", prefix)
+    except CacheUnavailable as e:
+        print("Invalidación perdida (cache no disponible):", prefix, e)
+
+async def invalidate_tags(tags: List[str]) -> List[str]:
+    """
+    Borra de forma atómica todas las claves guardadas con alguna de las
+    etiquetas (en Redis y en el L1 de todas las réplicas).
+    Devuelve las claves invalidadas.
+    """
+    if not tags:
+        return []
+    try:
+        keys = await _call("invalidate_tags", list(dict.fromkeys(tags)))
+    except CacheUnavailable as e:
+        print("Invalidación perdida (cache no disponible):", tags, e)
+        return []
+    l1_evict(keys)
+    return keys
+
+async def cache_lock(key: str, ttl_ms: int) -> Optional[str]:
+    """
+    Intenta tomar el lock distribuido de 'key'. Devuelve el token del
+    lock o None si otra réplica ya lo tiene. Lanza CacheUnavailable si
+    la cache no responde.
+    """
+    return await _call("lock", key, ttl_ms)
+
+async def cache_unlock(key: str, token: str) -> None:
+    """
+    Libera el lock solo si sigue siendo nuestro (si la cache no
+    responde, el lock caduca solo con su TTL).
+    """
+    try:
+        await _call("unlock", key, token)
+    except CacheUnavailable:
+        pass
+
+# -------------------------------------------------------------------------
+# Cache-aside con single-flight
+# -------------------------------------------------------------------------
+# Reconstrucciones en curso en este proceso, por clave
+_inflight: Dict[str, "asyncio.Task[Any]"] = {}
+
+# Etiquetas fijas o calculadas a partir del valor cargado
+Tags = Union[List[str], Callable[[Any], List[str]], None]
+# Serializa el valor cargado a la respuesta HTTP que se cachea
+Render = Optional[Callable[[Any], CachedResponse]]
+
+# Aviso de la réplica que tenía el lock de que su reconstrucción no guardó
+# nada (el loader lanzó, p.ej. un 404): las que esperan el valor dejan de
+# hacerlo. Va en su propia clave (fuera del L1) con la hora de escritura,
+# para ignorar avisos de reconstrucciones anteriores a la espera.
+_NOT_CACHED_TTL = 1
+
+def _not_cached_key(key: str) -> str:
+    return f"nocache:{key}"
+
+async def _mark_not_cached(key: str) -> None:
+    try:
+        await _call("set", _not_cached_key(key), time.time(), _NOT_CACHED_TTL)
+    except CacheUnavailable:
+        pass
+
+async def _not_cached_since(key: str, since: float) -> bool:
+    try:
+        entry = await _call("get", _not_cached_key(key))
+    except CacheUnavailable:
+        return False
+    return entry is not None and entry[0] >= since
+
+async def _wait_for_value(key: str, render: Render = None) -> Optional[Any]:
+    """
+    Espera (polling) a que la réplica que tiene el lock publique un valor
+    fresco. None si no llega a tiempo o si esa réplica avisa de que no va
+    a guardar nada (ver _mark_not_cached).
+    """
+    lookup = cache_get_entry if render is None else cache_get_response_entry
+    since = time.time()
+    deadline = time.monotonic() + LOCK_WAIT_MS / 1000
+    while time.monotonic() < deadline:
+        await asyncio.sleep(LOCK_POLL_MS / 1000)
+        value, stale = await lookup(key)
+        if value is not None and not stale:
+            return value
+        if await _not_cached_since(key, since):
+            return None
+    return None
+
+async def _rebuild(
+    key: str,
+    ttl: int,
+    loader: Callable[[], Awaitable[Any]],
+    stale_ttl: Optional[int] = None,
+    background: bool = False,
+    tags: Tags = None,
+    render: Render = None
+) -> Any:
+    token = None
+    if DISTRIBUTED_LOCK:
+        try:
+            token = await cache_lock(key, LOCK_TTL_MS)
+            held_by_other = token is None
+        except CacheUnavailable:
+            # Sin cache no hay lock que respetar: reconstruimos directamente
+            held_by_other = False
+        if held_by_other:
+            # Otra réplica está reconstruyendo. En un refresco en segundo
+            # plano no hace falta esperarla: ya servimos el valor stale.
+            if background:
+                return None
+            # Si no, usamos su resultado si llega a tiempo, o reconstruimos.
+            value = await _wait_for_value(key, render)
+            if value is not None:
+                return value
+    stored = False
+    try:
+        value = await loader()
+        tag_list = tags(value) if callable(tags) else tags
+        if render is None:
+            await cache_set(key, value, ttl, stale_ttl, tag_list)
+            stored = True
+            return value
+        cached = render(value)
+        await cache_set_response(key, cached, ttl, stale_ttl, tag_list)
+        stored = True
+        return cached
+    finally:
+        if token is not None:
+            if not stored:
+                await _mark_not_cached(key)
+            await cache_unlock(key, token)
+
+def _forget(key: str, task: "asyncio.Task[Any]") -> None:
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    # Marca la excepción como recuperada aunque ningún waiter siga vivo
+    if not task.cancelled():
+        task.exception()
+
+def _start_rebuild(key: str, *args: Any, **kwargs: Any) -> "asyncio.Task[Any]":
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_rebuild(key, *args, **kwargs))
+        _inflight[key] = task
+        task.add_done_callback(lambda t: _forget(key, t))
+    return task
+
+async def _get_or_set(
+    key: str,
+    ttl: int,
+    loader: Callable[[], Awaitable[Any]],
+    stale_ttl: Optional[int],
+    tags: Tags,
+    render: Render
+) -> Tuple[Any, str]:
+    lookup = cache_get_entry if render is None else cache_get_response_entry
+    prefix = key_prefix(key)
+    cached, stale = await lookup(key)
+    if cached is not None and not stale:
+        CACHE_RESULTS.labels(prefix, "HIT").inc()
+        return cached, "HIT"
+    if cached is not None:
+        CACHE_RESULTS.labels(prefix, "STALE").inc()
+        _start_rebuild(key, ttl, loader, stale_ttl, background=True, tags=tags, render=render)
+        return cached, "STALE"
+
+    CACHE_RESULTS.labels(prefix, "MISS").inc()
+    task = _start_rebuild(key, ttl, loader, stale_ttl, tags=tags, render=render)
+    value = await asyncio.shield(task)
+    if value is None:
+        # Nos unimos a un refresco en segundo plano que cedió el lock a
+        # otra réplica y no trajo valor: reconstruimos nosotros.
+        value = await _rebuild(key, ttl, loader, stale_ttl, tags=tags, render=render)
+    return value, "MISS"
+
+async def cache_get_or_set(
+    key: str,
+    ttl: int,
+    loader: Callable[[], Awaitable[Any]],
+    stale_ttl: Optional[int] = None,
+    tags: Tags = None
+) -> Tuple[Any, str]:
+    """
+    Cache-aside con single-flight: ante un miss solo una corrutina por
+    clave (en este proceso) ejecuta 'loader' y guarda el resultado; el
+    resto espera ese mismo resultado (o su excepción, p.ej. un 404).
+
+    La reconstrucción corre en su propia task, así que si la petición
+    que la lanzó se cancela, las demás siguen esperando el valor.
+
+    Con 'stale_ttl' (stale-while-revalidate) el valor se guarda con
+    soft TTL = ttl; pasado ese tiempo se sirve al instante como STALE
+    mientras una task en segundo plano lo refresca desde Mongo.
+
+    'tags' son las etiquetas de invalidación de la clave: una lista o una
+    función que las calcula a partir del valor cargado.
+
+    Devuelve (valor, "HIT" | "STALE" | "MISS").
+    """
+    return await _get_or_set(key, ttl, loader, stale_ttl, tags, None)
+
+async def cache_get_or_set_response(
+    key: str,
+    ttl: int,
+    loader: Callable[[], Awaitable[Any]],
+    render: Callable[[Any], CachedResponse],
+    stale_ttl: Optional[int] = None,
+    tags: Tags = None
+) -> Tuple[CachedResponse, str]:
+    """
+    Como cache_get_or_set, pero lo que se cachea es la respuesta HTTP ya
+    serializada: ante un miss, render(valor de loader) construye el
+    CachedResponse (las 'tags' se calculan sobre el valor, no sobre los
+    bytes). En un HIT se devuelven los bytes guardados sin json.loads,
+    modelos ni validación de response_model.
+
+    Devuelve (CachedResponse, "HIT" | "STALE" | "MISS").
     """
-    resp = await _client.delete(f"{CACHE_API}/cache/{key}")
-    if resp.status_code not in (204, 404):
-        resp.raise_for_status()
+    return await _get_or_set(key, ttl, loader, stale_ttl, tags, render)
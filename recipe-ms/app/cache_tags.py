@@ -0,0 +1,34 @@
+# app/cache_tags.py
+from typing import Any, Callable, Dict, List
+
+# Etiquetas de invalidación de la cache. Cada clave se guarda con las
+# etiquetas de los datos de los que depende; las escrituras solo tienen
+# que invalidar las etiquetas de lo que han modificado:
+#   feed              → páginas del feed global
+#   user:{id}         → páginas del feed de un usuario
+#   recipe:{id}       → detalle de la receta, páginas que la contienen y
+#                       sus comentarios
+#   comments:{id}     → listados de comentarios de la receta
+FEED = "feed"
+
+
+def user_tag(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+def recipe_tag(recipe_id: str) -> str:
+    return f"recipe:{recipe_id}"
+
+
+def comments_tag(recipe_id: str) -> str:
+    return f"comments:{recipe_id}"
+
+
+def page_tags(*tags: str) -> Callable[[List[Dict[str, Any]]], List[str]]:
+    """
+    Etiquetas de una página de recetas: las fijas más recipe:{id} de
+    cada receta de la página (se calculan con el valor ya cargado).
+    """
+    def build(items: List[Dict[str, Any]]) -> List[str]:
+        return [*tags, *(recipe_tag(r["id"]) for r in items)]
+    return build
@@ -1,11 +1,13 @@
 import os
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
+from app.instrumentation import mongo_listener
 
 load_dotenv()
 
 MONGO_URL = os.getenv("MONGO_URL")
-client = AsyncIOMotorClient(MONGO_URL)
+# El listener mide cada comando (métricas, Server-Timing, log de lentas)
+client = AsyncIOMotorClient(MONGO_URL, event_listeners=[mongo_listener])
 db = client.get_default_database()
 
 def get_collection(name: str):
@@ -0,0 +1,50 @@
+# app/indexes.py
+from typing import Dict, List
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+from app.db import get_collection
+
+# Índices que necesitan las consultas de recipe-ms, por colección.
+# recipe-db/initdb solo se ejecuta al crear el volumen; este registro se
+# aplica en cada arranque (ensure_indexes), así que un índice nuevo llega
+# también a las BDs existentes. Los que ya estaban en initdb se declaran
+# con las mismas claves y opciones para que Mongo los reconozca como
+# existentes en lugar de fallar por conflicto.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "recipes": [
+        # feed de un usuario: find({user_id}).sort(_id, -1) + cursor _id $lt
+        IndexModel([("user_id", ASCENDING), ("_id", DESCENDING)]),
+        IndexModel([("created_at", DESCENDING)]),
+        IndexModel(
+            [("title", TEXT), ("description", TEXT), ("ingredients", TEXT)],
+            default_language="spanish",
+        ),
+    ],
+    "comments": [
+        # comentarios de una receta (todos o solo los padre, parent_id null)
+        IndexModel([("recipe_id", ASCENDING), ("parent_id", ASCENDING), ("created_at", ASCENDING)]),
+        # replies en lote: find({parent_id: {$in: [...]}})
+        IndexModel([("parent_id", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING)]),
+    ],
+    "likes": [
+        # un like por usuario y receta (el upsert de add_like se apoya en él)
+        # y búsqueda por receta, que es su prefijo
+        IndexModel([("recipe_id", ASCENDING), ("user_id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING)]),
+    ],
+}
+
+
+async def ensure_indexes() -> None:
+    """
+    Crea los índices del registro que falten (createIndexes es idempotente).
+    Un conflicto con un índice existente se registra sin impedir el arranque.
+    """
+    for name, models in INDEXES.items():
+        coll = get_collection(name)
+        for model in models:
+            try:
+                await coll.create_indexes([model])
+            except OperationFailure as e:
+                print(f"No se pudo crear el índice {model.document['name']} en {name}: {e}")
@@ -0,0 +1,164 @@
+# app/instrumentation.py
+import os
+import json
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import Request
+from pymongo import monitoring
+from prometheus_client import Counter, Histogram
+
+# Umbral (ms) a partir del cual un comando de Mongo se registra como lento
+MONGO_SLOW_MS = float(os.getenv("MONGO_SLOW_MS", 100))
+
+# Comandos internos del driver (handshake, heartbeats, auth) que no cuentan
+_IGNORED = {"hello", "ismaster", "isMaster", "ping", "saslStart", "saslContinue",
+            "endSessions", "buildInfo", "getLastError"}
+
+MONGO_COMMANDS = Counter(
+    "recipe_mongo_commands_total",
+    "Comandos enviados a Mongo",
+    ["command", "collection", "outcome"],
+)
+MONGO_COMMAND_SECONDS = Histogram(
+    "recipe_mongo_command_duration_seconds",
+    "Duración de los comandos de Mongo",
+    ["command", "collection"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+MONGO_COMMANDS_PER_REQUEST = Histogram(
+    "recipe_mongo_commands_per_request",
+    "Comandos de Mongo por petición HTTP",
+    ["route"],
+    buckets=(0, 1, 2, 3, 4, 6, 8, 12, 20, 50),
+)
+
+
+class RequestStats:
+    """Comandos de Mongo de una petición: (comando, colección, ms)."""
+
+    def __init__(self):
+        # list.append es atómico: los hilos del executor de motor pueden
+        # registrar comandos de la misma petición a la vez
+        self.commands: List[Tuple[str, str, float]] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.commands)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(ms for _, _, ms in self.commands)
+
+
+# motor ejecuta pymongo en un executor copiando el contexto, así que el
+# listener ve el RequestStats de la petición que lanzó el comando
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("mongo_request_stats", default=None)
+
+
+def query_shape(value: Any) -> Any:
+    """
+    Forma de un filtro sin sus valores: {"user_id": "42", "_id": {"$lt": X}}
+    → {"user_id": "?", "_id": {"$lt": "?"}}. Sirve para agrupar consultas
+    lentas sin volcar datos de usuarios al log.
+    """
+    if isinstance(value, dict):
+        return {k: query_shape(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        # Pipelines y $or/$and conservan cada documento; las listas de
+        # valores ($in, $nin...) se colapsan a un solo "?"
+        if value and all(isinstance(v, dict) for v in value):
+            return [query_shape(v) for v in value]
+        return ["?"] if value else []
+    return "?"
+
+
+def _collection_of(name: str, command: Dict[str, Any]) -> str:
+    if name == "getMore":
+        return command.get("collection", "")
+    coll = command.get(name)
+    return coll if isinstance(coll, str) else ""
+
+
+def _filter_of(name: str, command: Dict[str, Any]) -> Any:
+    if name in ("find", "count", "distinct"):
+        return command.get("filter", command.get("query"))
+    if name == "findAndModify":
+        return command.get("query")
+    if name == "aggregate":
+        return command.get("pipeline")
+    if name == "update":
+        return [u.get("q") for u in command.get("updates", [])[:1]]
+    if name == "delete":
+        return [d.get("q") for d in command.get("deletes", [])[:1]]
+    return None
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    Mide cada comando de Mongo: métricas Prometheus por comando y
+    colección, acumulado por petición (Server-Timing) y log de las
+    consultas que superan MONGO_SLOW_MS con la forma de su filtro.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[Any, int], Tuple[str, str, str, Any]] = {}
+
+    def started(self, event):
+        if event.command_name in _IGNORED:
+            return
+        name = event.command_name
+        self._pending[(event.connection_id, event.request_id)] = (
+            name,
+            event.database_name,
+            _collection_of(name, event.command),
+            _filter_of(name, event.command),
+        )
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+    def _finish(self, event, outcome: str) -> None:
+        info = self._pending.pop((event.connection_id, event.request_id), None)
+        if info is None:
+            return
+        name, database, coll, filter_ = info
+        ms = event.duration_micros / 1000
+
+        MONGO_COMMANDS.labels(name, coll, outcome).inc()
+        MONGO_COMMAND_SECONDS.labels(name, coll).observe(ms / 1000)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.commands.append((name, coll, ms))
+
+        if ms >= MONGO_SLOW_MS:
+            shape = json.dumps(query_shape(filter_), default=str)
+            print(f"Mongo lento ({ms:.1f} ms): {name} {database}.{coll} filtro={shape}")
+
+
+mongo_listener = MongoCommandListener()
+
+
+async def mongo_timing_middleware(request: Request, call_next):
+    """
+    Acumula los comandos de Mongo de la petición y los expone en el header
+    Server-Timing (mongo;dur=<ms>;desc="<n> cmds") y en métricas.
+    """
+    stats = RequestStats()
+    token = _request_stats.set(stats)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _request_stats.reset(token)
+        route = request.scope.get("route")
+        MONGO_COMMANDS_PER_REQUEST.labels(getattr(route, "path", "unmatched")).observe(stats.count)
+
+    app_ms = (time.perf_counter() - start) * 1000
+    timing = f'mongo;dur={stats.total_ms:.1f};desc="{stats.count} cmds", app;dur={app_ms:.1f}'
+    existing = response.headers.get("Server-Timing")
+    response.headers["Server-Timing"] = f"{existing}, {timing}" if existing else timing
+    return response
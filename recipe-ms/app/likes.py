@@ -0,0 +1,177 @@
+# app/likes.py
+import os
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from app.db import get_collection
+from app.cache_client import CacheUnavailable, cache_lock
+
+# Cada receta guarda su número de likes en `likes_count`, que like/unlike
+# actualizan con $inc. Como el $inc y el insert/delete del like no son
+# atómicos entre sí, un job periódico lo recalcula desde la colección likes.
+# Segundos entre reconciliaciones (0 = solo al arrancar)
+LIKES_RECONCILE_INTERVAL = int(os.getenv("LIKES_RECONCILE_INTERVAL", 3600))
+# Lock distribuido que elige la réplica que reconcilia en cada intervalo
+_RECONCILE_LOCK = "likes:reconcile"
+
+
+async def bump_likes_count(recipe_id: str, delta: int) -> None:
+    """Suma 'delta' (+1 / -1) al contador de la receta."""
+    if not ObjectId.is_valid(recipe_id):
+        return
+    await get_collection("recipes").update_one(
+        {"_id": ObjectId(recipe_id)},
+        {"$inc": {"likes_count": delta}}
+    )
+
+
+async def add_like(recipe_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Registra el like con un único upsert sobre el índice único
+    (recipe_id, user_id) y devuelve el documento creado, o None si el
+    usuario ya había dado like. Dos likes concurrentes no pueden crear
+    duplicados: el segundo upsert choca con el índice (DuplicateKeyError).
+    """
+    created_at = datetime.utcnow().isoformat()
+    try:
+        res = await get_collection("likes").update_one(
+            {"recipe_id": recipe_id, "user_id": user_id},
+            {"$setOnInsert": {"created_at": created_at}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return None
+    if res.upserted_id is None:
+        return None
+    await bump_likes_count(recipe_id, 1)
+    return {
+        "id": str(res.upserted_id),
+        "recipe_id": recipe_id,
+        "user_id": user_id,
+        "created_at": created_at,
+    }
+
+
+async def remove_like(recipe_id: str, user_id: str) -> bool:
+    """Quita el like; False si no existía."""
+    res = await get_collection("likes").delete_one({"recipe_id": recipe_id, "user_id": user_id})
+    if res.deleted_count == 0:
+        return False
+    await bump_likes_count(recipe_id, -1)
+    return True
+
+
+async def _count_likes(recipe_ids: List[str]) -> Dict[str, int]:
+    """Cuenta los likes de varias recetas con un solo $group."""
+    pipeline = [
+        {"$match": {"recipe_id": {"$in": recipe_ids}}},
+        {"$group": {"_id": "$recipe_id", "count": {"$sum": 1}}},
+    ]
+    rows = await get_collection("likes").aggregate(pipeline).to_list(None)
+    return {row["_id"]: row["count"] for row in rows}
+
+
+async def get_likes_counts(recipe_ids: List[str]) -> Dict[str, int]:
+    """
+    {recipe_id: likes} para varias recetas con una sola consulta.
+    Las recetas que no existen (o ids no válidos) no aparecen en el
+    resultado. Las que aún no tienen contador (anteriores a la
+    reconciliación) se cuentan en la colección likes.
+    """
+    oids = [ObjectId(rid) for rid in recipe_ids if ObjectId.is_valid(rid)]
+    if not oids:
+        return {}
+    docs = await get_collection("recipes").find(
+        {"_id": {"$in": oids}}, {"likes_count": 1}
+    ).to_list(len(oids))
+
+    counts: Dict[str, int] = {}
+    uncounted: List[str] = []
+    for doc in docs:
+        rid = str(doc["_id"])
+        if "likes_count" in doc:
+            counts[rid] = doc["likes_count"]
+        else:
+            uncounted.append(rid)
+    if uncounted:
+        fallback = await _count_likes(uncounted)
+        counts.update({rid: fallback.get(rid, 0) for rid in uncounted})
+    return counts
+
+
+async def reconcile_likes_counts() -> int:
+    """
+    Recalcula `likes_count` desde la colección likes y corrige solo las
+    recetas que se han desviado. El $group inicial solo sirve para
+    encontrar candidatas: cada una se vuelve a contar justo antes de
+    escribir, con el valor leído en el filtro, para no escribir un
+    recuento anterior a un like/unlike que llegue durante la pasada.
+
+    Queda la ventana entre el insert/delete de un like y su $inc (no son
+    atómicos): si el recuento cae justo ahí, el contador queda desviado
+    en uno hasta la siguiente pasada. Devuelve cuántas recetas se han
+    corregido.
+    """
+    pipeline = [{"$group": {"_id": "$recipe_id", "count": {"$sum": 1}}}]
+    likes = get_collection("likes")
+    rows = await likes.aggregate(pipeline).to_list(None)
+    counted = {row["_id"]: row["count"] for row in rows}
+
+    coll = get_collection("recipes")
+    fixed = 0
+    async for doc in coll.find({}, {"likes_count": 1}):
+        rid = str(doc["_id"])
+        stored = doc.get("likes_count")
+        if stored == counted.get(rid, 0):
+            continue
+        count = await likes.count_documents({"recipe_id": rid})
+        if stored == count:
+            continue
+        res = await coll.update_one(
+            {"_id": doc["_id"], "likes_count": stored},
+            {"$set": {"likes_count": count}}
+        )
+        fixed += res.modified_count
+    return fixed
+
+
+async def _elected(interval: int) -> bool:
+    """
+    ¿Le toca a esta réplica reconciliar? El lock no se suelta: caduca tras
+    el intervalo, así que las demás réplicas (que arrancan o despiertan en
+    otro momento) no repiten la pasada. Sin cache no hay elección posible
+    y se reconcilia igualmente: una pasada repetida no desvía nada.
+    """
+    try:
+        return await cache_lock(_RECONCILE_LOCK, max(interval, 60) * 1000) is not None
+    except CacheUnavailable:
+        return True
+
+
+async def _reconcile_loop(interval: int) -> None:
+    while True:
+        try:
+            if await _elected(interval):
+                fixed = await reconcile_likes_counts()
+                print(f"Contadores de likes reconciliados ({fixed} corregidos).")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print("Error reconciliando contadores de likes:", e)
+        if interval <= 0:
+            return
+        await asyncio.sleep(interval)
+
+_reconcile_task: Optional[asyncio.Task] = None
+
+def start_likes_reconciler() -> asyncio.Task:
+    """
+    Reconcilia al arrancar y luego cada LIKES_RECONCILE_INTERVAL segundos
+    (solo la réplica que gana el lock).
+    """
+    global _reconcile_task
+    if _reconcile_task is None or _reconcile_task.done():
+        _reconcile_task = asyncio.create_task(_reconcile_loop(LIKES_RECONCILE_INTERVAL))
+    return _reconcile_task
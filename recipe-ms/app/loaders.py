@@ -0,0 +1,25 @@
+# app/loaders.py
+from typing import Any, Dict, List
+from strawberry.dataloader import DataLoader
+from app.db import get_collection
+
+
+async def load_replies(parent_ids: List[str]) -> List[List[Dict[str, Any]]]:
+    """
+    Batch de replies para el DataLoader: una sola consulta $in para
+    todos los comentarios padre pedidos en el mismo tick del event loop.
+    Devuelve los docs crudos de Mongo en el mismo orden que parent_ids.
+    """
+    coll = get_collection("comments")
+    raw = await coll.find({"parent_id": {"$in": list(parent_ids)}}).to_list(None)
+    grouped: Dict[str, List[Dict[str, Any]]] = {pid: [] for pid in parent_ids}
+    for doc in raw:
+        grouped[doc["parent_id"]].append(doc)
+    return [grouped[pid] for pid in parent_ids]
+
+
+def build_loaders() -> Dict[str, DataLoader]:
+    """DataLoaders nuevos por petición (su caché no debe compartirse entre peticiones)."""
+    return {
+        "replies_loader": DataLoader(load_fn=load_replies),
+    }
@@ -1,31 +1,49 @@
 from strawberry.fastapi import GraphQLRouter
 import strawberry
 import os
+import hashlib
 import httpx
-from app.schema import Query, Mutation, Comment, Recipe, get_current_user_id, Like
+from app.schema import Query, Mutation, Comment, Recipe, RecipeSummary, get_current_user_id, Like
 from app.db import client, get_collection
 from app.initial_data import get_initial_recipes
 from app.data import load_initial_data  
 from fastapi import FastAPI, Request, HTTPException, Body, status, Response, APIRouter
-from typing import List, Any, Dict
+from typing import List, Any, Dict, Optional
 from app.db import get_collection
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument
 from app.schema import CommentOut, CommentWithRepliesOut
-from pydantic import BaseModel, Field
-from app.cache_client import cache_get, cache_set,cache_del
-from app.utils import prepare_recipes
+from pydantic import BaseModel, Field, TypeAdapter
+from app.cache_client import (
+    CachedResponse, cache_get_or_set_response, invalidate_tags,
+    start_invalidation_listener, start_cache_client, close_cache_client
+)
+from app.cache_tags import FEED, user_tag, recipe_tag, comments_tag, page_tags
+from app.utils import RECIPE_SUMMARY_PROJECTION, prepare_recipe_summaries
+from app.pagination import page_params, feed_user_id, find_page, next_cursor, page_cache_key
+from app.loaders import build_loaders
+from app.instrumentation import mongo_timing_middleware
+from app.metrics import http_metrics_middleware
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from app.likes import add_like, remove_like, get_likes_counts, start_likes_reconciler
+from app.indexes import ensure_indexes
+from app.search import search_recipes
 from dotenv import load_dotenv
 router = APIRouter()
 load_dotenv()
 app = FastAPI(title="recipe-ms")
 COMMENTS_TTL = int(os.getenv("FEED_CACHE_TTL"))
+# Stale-while-revalidate de los feeds: segundos que se sigue sirviendo
+# una página vencida mientras se refresca en segundo plano (0 = off)
+FEED_STALE_TTL = int(os.getenv("FEED_STALE_TTL", 300)) or None
 # 1. Definir el esquema
 schema = strawberry.Schema(query=Query, mutation=Mutation)
 
 # 2. Definimos un context_getter tipado para que FastAPI inyecte Request
+#    (y un juego nuevo de DataLoaders por petición)
 def get_context(request: Request):
-    return {"request": request}
+    return {"request": request, **build_loaders()}
 
 graphql_app = GraphQLRouter(
     schema=schema,
@@ -34,6 +52,76 @@ graphql_app = GraphQLRouter(
     context_getter=get_context   # <-- use nuestra función con tipo Request
 )
 
+# Las lecturas REST cachean la respuesta ya serializada (CachedResponse):
+# en un HIT los bytes salen tal cual, sin json.loads, modelos ni la
+# validación/serialización de response_model. Estos adaptadores generan
+# en el MISS exactamente el JSON que produciría FastAPI con ese response_model.
+RECIPE_JSON = TypeAdapter(Recipe)
+RECIPE_SUMMARIES_JSON = TypeAdapter(List[RecipeSummary])
+COMMENTS_JSON = TypeAdapter(List[Comment])
+COMMENTS_WITH_REPLIES_JSON = TypeAdapter(List[CommentWithRepliesOut])
+
+# El navegador guarda la respuesta pero la revalida siempre (If-None-Match);
+# private porque los feeds de usuario dependen de headers de autenticación
+READ_CACHE_CONTROL = "private, no-cache"
+
+def etag_for(body: bytes) -> str:
+    """
+    ETag fuerte: hash del cuerpo. Se calcula una vez en el MISS y se guarda
+    con la respuesta en la cache, así que todas las réplicas dan el mismo.
+    Cualquier escritura invalida las etiquetas de la clave y el siguiente
+    MISS recalcula el ETag, que solo cambia si cambió el contenido.
+    """
+    return '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+
+def render_json(adapter: TypeAdapter, content: Any) -> CachedResponse:
+    """Serializa los modelos de la respuesta a JSON (solo en el MISS)."""
+    body = adapter.dump_json(adapter.validate_python(content), by_alias=True)
+    return CachedResponse(body, {"ETag": etag_for(body)})
+
+def render_page(items: List[Dict[str, Any]], limit: int) -> CachedResponse:
+    """Página de un feed, con el cursor de la siguiente en el header X-Next-Cursor."""
+    cached = render_json(RECIPE_SUMMARIES_JSON, [RecipeSummary(**r) for r in items])
+    cursor = next_cursor(items, limit)
+    if cursor:
+        cached.headers["X-Next-Cursor"] = cursor
+    return cached
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110): '*' o lista de ETags."""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return etag.removeprefix("W/") in (tag.removeprefix("W/") for tag in candidates)
+
+def cached_json(request: Request, cached: CachedResponse, cache_status: str) -> Response:
+    """
+    Response con los bytes cacheados, sus headers y X-Cache; o 304 sin
+    cuerpo si el cliente ya tiene esta versión (If-None-Match).
+    """
+    headers = {**cached.headers, "X-Cache": cache_status, "Cache-Control": READ_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), cached.headers.get("ETag")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+def _comment_to_cache(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Dict JSON-serializable de un comentario (created_at como string ISO)."""
+    created = doc.get("created_at")
+    if isinstance(created, datetime):
+        created_iso = created.isoformat()
+    else:
+        created_iso = str(created)
+    return {
+        "id": str(doc["_id"]),
+        "recipe_id": doc["recipe_id"],
+        "user_id": doc["user_id"],
+        "content": doc["content"],
+        "parent_id": doc.get("parent_id"),
+        "created_at": created_iso,
+    }
+
 class CommentWithReplies(Comment):
     replies: List[Comment]
 class CommentUpdateIn(BaseModel):
@@ -41,6 +129,16 @@ class CommentUpdateIn(BaseModel):
 
 app = FastAPI(title="Recipe Service")
 app.include_router(graphql_app, prefix="/graphql")
+# Comandos de Mongo por petición → header Server-Timing y métricas
+app.middleware("http")(mongo_timing_middleware)
+# Latencia por ruta y peticiones en curso
+app.middleware("http")(http_metrics_middleware)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas en formato Prometheus."""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
 # 3. Startup hook para Mongo + datos iniciales
@@ -51,7 +149,10 @@ async def on_startup():
         await client.admin.command("ping")
         print("MongoDB conectado correctamente.")
 
-        # b) Sembrar en la colección si está vacía
+        # b) Índices que necesitan las consultas (app/indexes.py)
+        await ensure_indexes()
+
+        # c) Sembrar en la colección si está vacía
         coll = get_collection("recipes")
         count = await coll.count_documents({})
         if count == 0:
@@ -63,148 +164,191 @@ async def on_startup():
         print("Error conectando o sembrando MongoDB:", e)
         raise
 
-    # c) Carga en memoria de tu lista Python
+    # d) Carga en memoria de tu lista Python
     load_initial_data()
     print("Datos iniciales cargados en memoria.")
 
+    # e) Pool de conexiones de la cache e invalidación del L1 vía pub/sub
+    await start_cache_client()
+    start_invalidation_listener()
+
+    # f) Reconciliación periódica de los contadores de likes
+    start_likes_reconciler()
 
-@app.get("/graphql/get_recipebyuserNA", response_model=List[Recipe])
-async def get_recipes_by_userNA(request: Request, response: Response):
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # Cierra las conexiones keep-alive hacia la cache antes de salir
+    await close_cache_client()
+
+
+@app.get("/graphql/get_recipebyuserNA", response_model=List[RecipeSummary])
+async def get_recipes_by_userNA(
+    request: Request,
+    limit: Optional[int] = None,
+    after: Optional[str] = None
+):
     user_id = request.query_params.get("user_id")
     if not user_id:
         raise HTTPException(400, "Debe indicar `user_id` como parámetro de consulta")
+    user_id = feed_user_id(user_id)
+    limit, after_oid = page_params(limit, after)
 
-    cache_key = f"recipes:user_feed:{user_id}"
-    cached = await cache_get(cache_key)
-    if cached is not None:
-        response.headers["X-Cache"] = "HIT"
-        return [Recipe(**r) for r in cached]
+    cache_key = page_cache_key(f"recipes:user_feed:summary:{user_id}", limit, after_oid)
 
-    # Leer de Mongo
-    coll = get_collection("recipes")
-    raw_docs = await coll.find({"user_id": user_id}).to_list(100)
+    async def load():
+        # Leer de Mongo (una página, solo el resumen) y transformar con helper
+        coll = get_collection("recipes")
+        raw_docs = await find_page(
+            coll, {"user_id": user_id}, limit, after_oid, RECIPE_SUMMARY_PROJECTION
+        )
+        return prepare_recipe_summaries(
+            raw_docs,
+            ensure_fields={"description": "", "user_id": user_id}
+        )
 
-    # Transformar con helper
-    data_to_cache, models = prepare_recipes(
-        raw_docs,
-        ensure_fields={"description": "", "user_id": user_id}
+    cached, cache_status = await cache_get_or_set_response(
+        cache_key, COMMENTS_TTL, load, lambda items: render_page(items, limit),
+        stale_ttl=FEED_STALE_TTL, tags=page_tags(user_tag(user_id))
     )
+    return cached_json(request, cached, cache_status)
 
-    # Cache miss
-    await cache_set(cache_key, data_to_cache, COMMENTS_TTL)
-    response.headers["X-Cache"] = "MISS"
-    return models
 
+@app.get("/graphql/get_recipes", response_model=List[RecipeSummary])
+async def get_recipes(
+    request: Request,
+    limit: Optional[int] = None,
+    after: Optional[str] = None
+):
+    limit, after_oid = page_params(limit, after)
 
-@app.get("/graphql/get_recipes", response_model=List[Recipe])
-async def get_recipes(request: Request, response: Response):
-    cache_key = "recipes:feed"
-    cached = await cache_get(cache_key)
-    if cached is not None:
-        response.headers["X-Cache"] = "HIT"
-        return [Recipe(**r) for r in cached]
+    cache_key = page_cache_key("recipes:feed:summary", limit, after_oid)
 
-    coll = get_collection("recipes")
-    raw_docs = await coll.find({}).to_list(100)
+    async def load():
+        coll = get_collection("recipes")
+        raw_docs = await find_page(coll, {}, limit, after_oid, RECIPE_SUMMARY_PROJECTION)
+        return prepare_recipe_summaries(
+            raw_docs,
+            ensure_fields={"description": "", "user_id": ""}
+        )
 
-    data_to_cache, models = prepare_recipes(
-        raw_docs,
-        ensure_fields={"description": "", "user_id": ""}
+    # Solo una corrutina por clave reconstruye el feed; el resto la espera
+    cached, cache_status = await cache_get_or_set_response(
+        cache_key, COMMENTS_TTL, load, lambda items: render_page(items, limit),
+        stale_ttl=FEED_STALE_TTL, tags=page_tags(FEED)
     )
+    return cached_json(request, cached, cache_status)
+
+@app.get(
+    "/graphql/search_recipes",
+    response_model=List[RecipeSummary],
+    responses={
+        200: {"description": "OK: recetas por relevancia; cursor siguiente en X-Next-Cursor"},
+        400: {"description": "Bad Request: `q` vacía o demasiado larga, o cursor inválido"},
+    }
+)
+async def search_recipes_route(
+    response: Response,
+    q: Optional[str] = None,
+    limit: Optional[int] = None,
+    after: Optional[str] = None
+):
+    # Búsqueda de texto completo ($text) paginada por relevancia; `after`
+    # es el cursor opaco de X-Next-Cursor de la página anterior
+    page, cache_status = await search_recipes(q, limit, after)
+    response.headers["X-Cache"] = cache_status
+    if page["next"]:
+        response.headers["X-Next-Cursor"] = page["next"]
+    return [RecipeSummary(**r) for r in page["items"]]
 
-    await cache_set(cache_key, data_to_cache, COMMENTS_TTL)
-    response.headers["X-Cache"] = "MISS"
-    return models
 @app.get(
     "/graphql/recipes/{recipe_id}",
     response_model=Recipe,
     status_code=status.HTTP_200_OK,
     responses={
         200: {"description": "OK: receta encontrada"},
+        304: {"description": "Not Modified: el ETag de If-None-Match sigue vigente"},
         400: {"description": "Bad Request: recipe_id inválido"},
         404: {"description": "Not Found: receta no existe"},
     }
 )
 async def get_recipe_by_id(
-    recipe_id: str,
-    response: Response
+    request: Request,
+    recipe_id: str
 ) -> Any:
     cache_key = f"recipes:detail:{recipe_id}"
 
-    # 1) Cache-hit
-    cached = await cache_get(cache_key)
-    if cached is not None:
-        response.headers["X-Cache"] = "HIT"
-        return Recipe(**cached)
+    async def load():
+        # 1) Validar ID
+        try:
+            oid = ObjectId(recipe_id)
+        except Exception:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, "`recipe_id` no es un ID válido")
 
-    # 2) Validar ID
-    try:
-        oid = ObjectId(recipe_id)
-    except Exception:
-        raise HTTPException(status.HTTP_400_BAD_REQUEST, "`recipe_id` no es un ID válido")
-
-    # 3) Leer Mongo
-    coll = get_collection("recipes")
-    doc = await coll.find_one({"_id": oid})
-    if not doc:
-        raise HTTPException(status.HTTP_404_NOT_FOUND, "Receta no encontrada")
+        # 2) Leer Mongo
+        coll = get_collection("recipes")
+        doc = await coll.find_one({"_id": oid})
+        if not doc:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, "Receta no encontrada")
 
-    # 4) Mapear a Pydantic
-    recipe_data: Dict[str, Any] = {
-        "id": str(doc["_id"]),
-        "images": doc.get("images", []),
-        "video": doc.get("video"),
-        "title": doc.get("title", ""),
-        "steps": doc.get("steps", []),
-        "prep_time": doc.get("prepTime", 0),
-        "portions": doc.get("portions", 1),
-        "description": doc.get("description", ""),
-        "user_id": doc.get("user_id"),
-    }
+        # 3) Mapear a dict plano (se cachea tal cual)
+        recipe_data: Dict[str, Any] = {
+            "id": str(doc["_id"]),
+            "images": doc.get("images", []),
+            "video": doc.get("video"),
+            "title": doc.get("title", ""),
+            "steps": doc.get("steps", []),
+            "prep_time": doc.get("prepTime", 0),
+            "portions": doc.get("portions", 1),
+            "description": doc.get("description", ""),
+            "user_id": doc.get("user_id"),
+            "likes_count": doc.get("likes_count", 0),
+        }
+        return recipe_data
 
-    # 5) Cache-miss: poblar Redis
-    await cache_set(cache_key, recipe_data, COMMENTS_TTL)
-    response.headers["X-Cache"] = "MISS"
-    return Recipe(**recipe_data)
+    # 4) Cache-aside con coalescing de misses
+    cached, cache_status = await cache_get_or_set_response(
+        cache_key, COMMENTS_TTL, load, lambda data: render_json(RECIPE_JSON, Recipe(**data)),
+        tags=[recipe_tag(recipe_id)]
+    )
+    return cached_json(request, cached, cache_status)
 
 @app.get(
     "/graphql/get_recipebyuser",
-    response_model=List[Recipe]
+    response_model=List[RecipeSummary]
 )
 async def get_recipes_by_user(
     request: Request,
-    response: Response
+    limit: Optional[int] = None,
+    after: Optional[str] = None
 ):
     # 0) Autenticación (x-user-id o Authorization)
     try:
         info = type("Info", (), {"context": {"request": request}})
-        user_id = get_current_user_id(info)
+        user_id = feed_user_id(get_current_user_id(info))
     except HTTPException as e:
         raise e
+    limit, after_oid = page_params(limit, after)
 
-    # clave de cache para este usuario
-    cache_key = f"recipes:user_feed:{user_id}"
+    # clave de cache para esta página del usuario
+    cache_key = page_cache_key(f"recipes:user_feed:summary:{user_id}", limit, after_oid)
 
-    # 1) Intentar cache-hit
-    cached = await cache_get(cache_key)
-    if cached is not None:
-        response.headers["X-Cache"] = "HIT"
-        return [Recipe(**r) for r in cached]
+    async def load():
+        # 1) Lectura desde Mongo (una página, solo el resumen)
+        coll = get_collection("recipes")
+        raw_docs = await find_page(
+            coll, {"user_id": user_id}, limit, after_oid, RECIPE_SUMMARY_PROJECTION
+        )
 
-    # 2) Lectura desde Mongo
-    coll = get_collection("recipes")
-    raw_docs = await coll.find({"user_id": user_id}).to_list(100)
+        # 2) Transformar con helper
+        return prepare_recipe_summaries(raw_docs, ensure_fields={"user_id": user_id})
 
-    # 3) Transformar con helper
-    data_to_cache, models = prepare_recipes(
-        raw_docs,
-        ensure_fields={"user_id": user_id}
+    # 3) Cache-aside con coalescing de misses
+    cached, cache_status = await cache_get_or_set_response(
+        cache_key, COMMENTS_TTL, load, lambda items: render_page(items, limit),
+        stale_ttl=FEED_STALE_TTL, tags=page_tags(user_tag(user_id))
     )
-
-    # 4) Cache-miss: poblar Redis
-    await cache_set(cache_key, data_to_cache, COMMENTS_TTL)
-    response.headers["X-Cache"] = "MISS"
-    return models
+    return cached_json(request, cached, cache_status)
 
 
 @app.post(
@@ -236,7 +380,7 @@ async def create_recipe(
 
     # 3) Insertar en Mongo
     coll = get_collection("recipes")
-    res = await coll.insert_one({
+    saved = {
         "user_id":    user_id,
         "title":      title,
         "description":description,
@@ -245,17 +389,16 @@ async def create_recipe(
         "steps":      steps,
         "images":     images,
         "video":      video,
-    })
+        "likes_count": 0,
+    }
+    res = await coll.insert_one(saved)
 
-    # 4) Leer y normalizar
-    saved = await coll.find_one({"_id": res.inserted_id})
-    saved["id"] = str(saved.pop("_id"))
+    # 4) Normalizar el propio documento insertado (sin releerlo de Mongo)
+    saved.pop("_id", None)
+    saved["id"] = str(res.inserted_id)
 
-    # 5) Invalidar cachés relevantes
-    # - feed global
-    await cache_del("recipes:feed")
-    # - feed por usuario
-    await cache_del(f"recipes:user_feed:{user_id}")
+    # 5) Invalidar cachés relevantes: páginas del feed global y del usuario
+    await invalidate_tags([FEED, user_tag(user_id)])
 
     # 6) Devolver la nueva receta
     return Recipe(**saved)
@@ -273,8 +416,8 @@ async def create_comment(
 ):
     """
     Crea un comentario en Mongo para la receta. Requiere autenticación.
-    Invalida cache tanto de comments simples como de comments con replies.
-    Opcionalmente repuebla cache de comments simples y/o con replies.
+    Invalida (etiqueta comments:{recipe_id}) la cache tanto de comments
+    simples como de comments con replies.
     """
     # 1) Autenticación / extracción de user_id
     try:
@@ -301,9 +444,9 @@ async def create_comment(
             detail="`recipe_id` no es un ID válido"
         )
 
-    # 3) Verificar receta existe
+    # 3) Verificar receta existe (solo el _id)
     coll_recipes = get_collection("recipes")
-    if not await coll_recipes.find_one({"_id": oid}):
+    if not await coll_recipes.find_one({"_id": oid}, {"_id": 1}):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Receta no encontrada"
@@ -318,20 +461,16 @@ async def create_comment(
         "parent_id": parent_id,
         "created_at": datetime.utcnow(),
     }
-    insert_res = await coll_comments.insert_one(new_doc)
-
-    # 5) Leer guardado y preparar objeto de retorno
-    saved = await coll_comments.find_one({"_id": insert_res.inserted_id})
-    saved["id"] = str(saved.pop("_id"))
-
-    # 6) Invalidate cache de ambos endpoints
-    key_simple = f"recipes:comments:{recipe_id}"
-    key_with_replies = f"recipes:comments_with_replies:{recipe_id}"
-    # Invalida ambas clave
-    await cache_del(key_simple)
-    await cache_del(key_with_replies)
+    await coll_comments.insert_one(new_doc)
+
+    # 5) Preparar el objeto de retorno con el documento insertado
+    #    (insert_one ya le ha puesto el _id)
+    saved = _comment_to_cache(new_doc)
+
+    # 6) Invalidar los listados de comentarios (simple y con replies)
+    invalidated = await invalidate_tags([comments_tag(recipe_id)])
     # Opcional: marcar header para debugging
-    response.headers["X-Cache-Invalidated"] = f"{key_simple}, {key_with_replies}"
+    response.headers["X-Cache-Invalidated"] = ",".join(invalidated)
     return Comment(**saved)
 
 #obtener los comentarios de una receta
@@ -340,153 +479,108 @@ async def create_comment(
     response_model=List[Comment],
     responses={
         200: {"description": "OK: lista de comentarios"},
+        304: {"description": "Not Modified: el ETag de If-None-Match sigue vigente"},
         400: {"description": "Bad Request: recipe_id inválido"},
         404: {"description": "Not Found: receta no existe"}
     }
 )
 async def get_comments_for_recipe(
-    recipe_id: str,
-    response: Response
+    request: Request,
+    recipe_id: str
 ):
     cache_key = f"recipes:comments:{recipe_id}"
 
-    # 0) Intentamos cache-hit
-    cached = await cache_get(cache_key)
-    if cached is not None:
-        response.headers["X-Cache"] = "HIT"
-        # cached ya es una lista de dicts validos para Comment
-        return [Comment(**c) for c in cached]
-
-    # 1) Validar recipe_id
-    try:
-        _ = ObjectId(recipe_id)
-    except:
-        raise HTTPException(400, "`recipe_id` no es un ID válido")
-
-    # 2) Verificar que la receta existe
-    coll_recipes = get_collection("recipes")
-    if not await coll_recipes.find_one({"_id": ObjectId(recipe_id)}):
-        raise HTTPException(404, "Receta no encontrada")
-
-    # 3) Recuperar comentarios de Mongo
-    coll_comments = get_collection("comments")
-    raw = await coll_comments.find({"recipe_id": recipe_id}).to_list(100)
-
-    # 4) Construir listas paralelas:
-    comments_data = []
-    comments_models = []
-    for doc in raw:
-        cdict = {
-            "id": str(doc["_id"]),
-            "recipe_id": doc["recipe_id"],
-            "user_id": doc["user_id"],
-            "content": doc["content"],
-            "parent_id": doc.get("parent_id"),
-            "created_at": doc["created_at"],
-        }
-        comments_data.append(cdict)             # -> para cache
-        comments_models.append(Comment(**cdict))  # -> para la respuesta
-
-    # 5) Cache‐miss: poblar Redis con los dicts puros
-    await cache_set(cache_key, comments_data, COMMENTS_TTL)
-    response.headers["X-Cache"] = "MISS"
-
-    return comments_models
+    async def load():
+        # 1) Validar recipe_id
+        try:
+            _ = ObjectId(recipe_id)
+        except:
+            raise HTTPException(400, "`recipe_id` no es un ID válido")
+
+        # 2) Verificar que la receta existe
+        coll_recipes = get_collection("recipes")
+        if not await coll_recipes.find_one({"_id": ObjectId(recipe_id)}):
+            raise HTTPException(404, "Receta no encontrada")
+
+        # 3) Recuperar comentarios de Mongo
+        coll_comments = get_collection("comments")
+        raw = await coll_comments.find({"recipe_id": recipe_id}).to_list(100)
+
+        # 4) Dicts puros para la cache (y para construir la respuesta)
+        return [_comment_to_cache(doc) for doc in raw]
+
+    # 5) Cache-aside con coalescing de misses
+    cached, cache_status = await cache_get_or_set_response(
+        cache_key, COMMENTS_TTL, load, lambda data: render_json(COMMENTS_JSON, [Comment(**c) for c in data]),
+        tags=[comments_tag(recipe_id), recipe_tag(recipe_id)]
+    )
+    return cached_json(request, cached, cache_status)
 
 @app.get(
     "/graphql/recipes/{recipe_id}/comments",
     response_model=List[CommentWithRepliesOut],
     responses={
         200: {"description": "OK: comentarios con sus replies"},
+        304: {"description": "Not Modified: el ETag de If-None-Match sigue vigente"},
         400: {"description": "Bad Request: recipe_id inválido"},
         404: {"description": "Not Found: receta no existe"},
     },
     status_code=status.HTTP_200_OK
 )
 async def list_comments_with_replies(
-    recipe_id: str,
-    response: Response
+    request: Request,
+    recipe_id: str
 ):
     cache_key = f"recipes:comments_with_replies:{recipe_id}"
 
-    # 0) Intentamos cache-hit
-    cached = await cache_get(cache_key)
-    if cached is not None:
-        response.headers["X-Cache"] = "HIT"
-        # cached es lista de dicts cuyos campos created_at ya son strings ISO
-        return [CommentWithRepliesOut(**item) for item in cached]
-
-    # 1) Validar recipe_id
-    try:
-        oid = ObjectId(recipe_id)
-    except Exception:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
-                            detail="`recipe_id` no es un ID válido")
-
-    # 2) Verificar receta existe
-    coll_recipes = get_collection("recipes")
-    if not await coll_recipes.find_one({"_id": oid}):
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                            detail="Receta no encontrada")
-
-    # 3) Obtener comentarios padre
-    coll_comments = get_collection("comments")
-    raw_comments = await coll_comments.find({
-        "recipe_id": recipe_id,
-        "parent_id": None
-    }).to_list(100)
-
-    # 4) Construir data_to_cache y modelos
-    data_to_cache = []
-    models: List[CommentWithRepliesOut] = []
-
-    for doc in raw_comments:
-        # Convertir created_at a ISO string
-        created = doc.get("created_at")
-        if isinstance(created, datetime):
-            created_iso = created.isoformat()
-        else:
-            created_iso = str(created)
-
-        base = {
-            "id": str(doc["_id"]),
-            "recipe_id": doc["recipe_id"],
-            "user_id": doc["user_id"],
-            "content": doc["content"],
-            "parent_id": doc.get("parent_id"),
-            "created_at": created_iso,
-        }
-
-        # 4a) Recuperar sus replies
-        raw_replies = await coll_comments.find({"parent_id": base["id"]}).to_list(100)
-        replies_data = []
-        for r in raw_replies:
-            # Convertir each reply created_at a ISO string
-            r_created = r.get("created_at")
-            if isinstance(r_created, datetime):
-                r_created_iso = r_created.isoformat()
-            else:
-                r_created_iso = str(r_created)
-            reply_item = {
-                "id": str(r["_id"]),
-                "recipe_id": r["recipe_id"],
-                "user_id": r["user_id"],
-                "content": r["content"],
-                "parent_id": r.get("parent_id"),
-                "created_at": r_created_iso,
-            }
-            replies_data.append(reply_item)
-
-        item_data = {**base, "replies": replies_data}
-        data_to_cache.append(item_data)
-        # Construir modelo Pydantic: CommentWithRepliesOut espera created_at como str (ISO)
-        models.append(CommentWithRepliesOut(**item_data))
-
-    # 5) Cache‐miss: guardamos en cache-API
-    await cache_set(cache_key, data_to_cache, COMMENTS_TTL)
-    response.headers["X-Cache"] = "MISS"
-
-    return models
+    async def load():
+        # 1) Validar recipe_id
+        try:
+            oid = ObjectId(recipe_id)
+        except Exception:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail="`recipe_id` no es un ID válido")
+
+        # 2) Verificar receta existe
+        coll_recipes = get_collection("recipes")
+        if not await coll_recipes.find_one({"_id": oid}):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail="Receta no encontrada")
+
+        # 3) Obtener comentarios padre
+        coll_comments = get_collection("comments")
+        raw_comments = await coll_comments.find({
+            "recipe_id": recipe_id,
+            "parent_id": None
+        }).to_list(100)
+
+        # 4) Recuperar TODAS las replies en una sola consulta ($in)
+        #    en lugar de una consulta por comentario padre (N+1)
+        parent_ids = [str(doc["_id"]) for doc in raw_comments]
+        replies_by_parent: Dict[str, List[Dict[str, Any]]] = {pid: [] for pid in parent_ids}
+        if parent_ids:
+            raw_replies = await coll_comments.find({
+                "parent_id": {"$in": parent_ids}
+            }).to_list(100 * len(parent_ids))
+            for r in raw_replies:
+                replies_by_parent[r["parent_id"]].append(_comment_to_cache(r))
+
+        # 5) Construir data_to_cache (created_at ya como string ISO)
+        data_to_cache = []
+        for doc in raw_comments:
+            base = _comment_to_cache(doc)
+            data_to_cache.append({**base, "replies": replies_by_parent[base["id"]]})
+        return data_to_cache
+
+    # 6) Cache-aside con coalescing de misses
+    cached, cache_status = await cache_get_or_set_response(
+        cache_key, COMMENTS_TTL, load,
+        lambda data: render_json(
+            COMMENTS_WITH_REPLIES_JSON, [CommentWithRepliesOut(**item) for item in data]
+        ),
+        tags=[comments_tag(recipe_id), recipe_tag(recipe_id)]
+    )
+    return cached_json(request, cached, cache_status)
 
 @app.put(
     "/graphql/comments/{comment_id}",
@@ -521,36 +615,27 @@ async def rest_update_comment(
 
     coll = get_collection("comments")
 
-    # 3) Recuperar el comentario
-    original = await coll.find_one({"_id": oid})
-    if not original:
-        raise HTTPException(404, detail="Comentario no existe")
-
-    # 4) Verificar autoría
-    if original.get("user_id") != user_id:
-        raise HTTPException(403, detail="No puedes editar este comentario")
-
-    # 5) Actualizar contenido
-    await coll.update_one(
-        {"_id": oid},
-        {"$set": {"content": payload.content}}
+    # 3) Actualizar solo si el autor coincide y recibir el doc ya actualizado
+    updated = await coll.find_one_and_update(
+        {"_id": oid, "user_id": user_id},
+        {"$set": {"content": payload.content}},
+        return_document=ReturnDocument.AFTER
     )
 
-    # 6) Leer y normalizar resultado
-    updated = await coll.find_one({"_id": oid})
-    updated["id"] = str(updated.pop("_id"))
+    # 4) Si no se actualizó: ¿no existe (404) o no es el autor (403)?
+    if updated is None:
+        if not await coll.find_one({"_id": oid}, {"_id": 1}):
+            raise HTTPException(404, detail="Comentario no existe")
+        raise HTTPException(403, detail="No puedes editar este comentario")
 
-    # 7) Invalidar caché de esta receta
-    recipe_id = updated["recipe_id"]
-    key_list        = f"recipes:comments:{recipe_id}"
-    key_with_replies = f"recipes:comments_with_replies:{recipe_id}"
+    # 5) Normalizar resultado
+    updated = _comment_to_cache(updated)
 
-    # borramos ambas claves
-    await cache_del(key_list)
-    await cache_del(key_with_replies)
+    # 6) Invalidar los comentarios cacheados de esta receta
+    invalidated = await invalidate_tags([comments_tag(updated["recipe_id"])])
 
     # opcional: exponer qué se invalidó
-    response.headers["X-Cache-Invalidated"] = ",".join([key_list, key_with_replies])
+    response.headers["X-Cache-Invalidated"] = ",".join(invalidated)
 
     return CommentOut(**updated)
 
@@ -585,26 +670,22 @@ async def rest_delete_comment(
 
     coll = get_collection("comments")
 
-    # 3) Recuperar antes de borrar para extraer recipe_id
-    original = await coll.find_one({"_id": oid})
-    if not original or original.get("user_id") != user_id:
-        # cubre 404 y 403 en un solo chequeo
-        raise HTTPException(404, detail="Comentario no existe o no tienes permiso")
-
-    recipe_id = original["recipe_id"]
+    # 3) Borrar solo si el autor coincide (devuelve el doc borrado para
+    #    saber qué receta invalidar)
+    deleted = await coll.find_one_and_delete({"_id": oid, "user_id": user_id})
 
-    # 4) Borrar
-    await coll.delete_one({"_id": oid})
+    # 4) Si no se borró: ¿no existe (404) o no es el autor (403)?
+    if deleted is None:
+        if not await coll.find_one({"_id": oid}, {"_id": 1}):
+            raise HTTPException(404, detail="Comentario no existe")
+        raise HTTPException(403, detail="No puedes borrar este comentario")
+    recipe_id = deleted["recipe_id"]
 
     # 5) Invalidar caché de lista y de with_replies
-    key_list         = f"recipes:comments:{recipe_id}"
-    key_with_replies = f"recipes:comments_with_replies:{recipe_id}"
-
-    await cache_del(key_list)
-    await cache_del(key_with_replies)
+    invalidated = await invalidate_tags([comments_tag(recipe_id)])
 
     # 6) Opcional: exponer claves invalidadas
-    response.headers["X-Cache-Invalidated"] = f"{key_list},{key_with_replies}"
+    response.headers["X-Cache-Invalidated"] = ",".join(invalidated)
 
     # FastAPI responde 204 No Content
     return
@@ -630,9 +711,9 @@ async def rest_like_recipe(request: Request):
         oid = ObjectId(recipe_id)
     except Exception:
         raise HTTPException(400, detail="`recipe_id` no es un ID válido")
-    # 3) Verificar receta existe
+    # 3) Verificar receta existe (solo el _id)
     coll_recipes = get_collection("recipes")
-    if not await coll_recipes.find_one({"_id": oid}):
+    if not await coll_recipes.find_one({"_id": oid}, {"_id": 1}):
         raise HTTPException(404, detail="Receta no existe")
     # 4) Autenticación
     try:
@@ -640,18 +721,12 @@ async def rest_like_recipe(request: Request):
         user_id = get_current_user_id(info)
     except HTTPException as e:
         raise e
-    # 5) Evitar duplicados
-    coll_likes = get_collection("likes")
-    if await coll_likes.find_one({"recipe_id": recipe_id, "user_id": user_id}):
+    # 5) Upsert atómico: el índice único (recipe_id, user_id) evita duplicados
+    doc = await add_like(recipe_id, user_id)
+    if doc is None:
         raise HTTPException(409, detail="Already liked")
-    # 6) Insertar
-    res = await coll_likes.insert_one({
-        "recipe_id":  recipe_id,
-        "user_id":    user_id,
-        "created_at": datetime.utcnow().isoformat()
-    })
-    doc = await coll_likes.find_one({"_id": res.inserted_id})
-    doc["id"] = str(doc.pop("_id"))
+    # 6) likes_count cambia en el detalle y en las páginas que la contienen
+    await invalidate_tags([recipe_tag(recipe_id)])
     return Like(**doc)
 
 
@@ -681,12 +756,12 @@ async def rest_unlike_recipe(request: Request):
         user_id = get_current_user_id(info)
     except HTTPException as e:
         raise e
-    # 4) borrar
-    coll_likes = get_collection("likes")
-    res = await coll_likes.delete_one({"recipe_id": recipe_id, "user_id": user_id})
-    if res.deleted_count == 0:
+    # 4) borrar (y descontar del contador de la receta)
+    if not await remove_like(recipe_id, user_id):
         raise HTTPException(404, detail="Like not found")
-    # 5) 204 No Content
+    # 5) Invalidar detalle y páginas que contienen la receta
+    await invalidate_tags([recipe_tag(recipe_id)])
+    # 6) 204 No Content
     return
 
 
@@ -702,14 +777,35 @@ async def rest_unlike_recipe(request: Request):
 async def rest_likes_count(recipe_id: str):
     # 1) validar id
     try:
-        oid = ObjectId(recipe_id)
+        _ = ObjectId(recipe_id)
     except:
         raise HTTPException(400, detail="`recipe_id` no es un ID válido")
-    # 2) existe receta?
-    coll_recipes = get_collection("recipes")
-    if not await coll_recipes.find_one({"_id": oid}):
+    # 2) leer el contador de la receta (ausente = la receta no existe)
+    counts = await get_likes_counts([recipe_id])
+    if recipe_id not in counts:
         raise HTTPException(404, detail="Receta no existe")
-    # 3) contar
-    coll_likes = get_collection("likes")
-    cnt = await coll_likes.count_documents({"recipe_id": recipe_id})
-    return cnt
+    return counts[recipe_id]
+
+
+class LikesCountsIn(BaseModel):
+    recipe_ids: List[str] = Field(..., max_length=500)
+
+#  POST contadores de varias recetas a la vez
+@app.post(
+    "/graphql/likes_counts",
+    response_model=Dict[str, int],
+    responses={
+        400: {"description": "Bad Request: algún recipe_id inválido"}
+    }
+)
+async def rest_likes_counts(payload: LikesCountsIn):
+    """
+    Devuelve {recipe_id: likes} para todas las recetas pedidas con una
+    sola consulta. Las recetas que no existen se omiten.
+    """
+    try:
+        for rid in payload.recipe_ids:
+            ObjectId(rid)
+    except Exception:
+        raise HTTPException(400, detail="Algún `recipe_id` no es un ID válido")
+    return await get_likes_counts(payload.recipe_ids)
@@ -0,0 +1,73 @@
+# app/metrics.py
+import time
+from fastapi import Request
+from prometheus_client import Counter, Enum, Gauge, Histogram
+
+# Métricas HTTP y de cache de recipe-ms (las de Mongo están en
+# app/instrumentation.py). Se exponen todas en GET /metrics.
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "recipe_http_request_duration_seconds",
+    "Latencia de las peticiones HTTP por ruta",
+    ["method", "route", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "recipe_http_requests_in_flight",
+    "Peticiones HTTP en curso",
+)
+CACHE_RESULTS = Counter(
+    "recipe_cache_results_total",
+    "Resultado de cache_get_or_set por prefijo de clave (HIT, STALE, MISS)",
+    ["prefix", "result"],
+)
+CACHE_L1_RESULTS = Counter(
+    "recipe_cache_l1_results_total",
+    "Aciertos y fallos del L1 en memoria por prefijo de clave",
+    ["prefix", "result"],
+)
+CACHE_BACKEND_SECONDS = Histogram(
+    "recipe_cache_backend_duration_seconds",
+    "Latencia de las llamadas al backend de cache (cache-API o Redis)",
+    ["operation", "outcome"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+CACHE_BREAKER_STATE = Enum(
+    "recipe_cache_breaker_state",
+    "Estado del circuit breaker de la cache",
+    states=["closed", "open", "half_open"],
+)
+CACHE_BREAKER_TRANSITIONS = Counter(
+    "recipe_cache_breaker_transitions_total",
+    "Cambios de estado del circuit breaker de la cache",
+    ["state"],
+)
+CACHE_BREAKER_SKIPPED = Counter(
+    "recipe_cache_breaker_skipped_total",
+    "Llamadas a la cache omitidas con el breaker abierto",
+    ["operation"],
+)
+
+
+def key_prefix(key: str) -> str:
+    """Familia de la clave: 'recipes:detail:123' → 'recipes:detail'."""
+    return ":".join(key.split(":")[:2])
+
+
+async def http_metrics_middleware(request: Request, call_next):
+    """Latencia por ruta (plantilla, no URL concreta) y peticiones en curso."""
+    HTTP_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            request.method, getattr(route, "path", "unmatched"), str(status)
+        ).observe(time.perf_counter() - start)
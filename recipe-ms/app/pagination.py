@@ -0,0 +1,77 @@
+# app/pagination.py
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from fastapi import HTTPException, status
+
+# Tamaño de página por defecto y máximo permitido para los feeds
+FEED_PAGE_SIZE = int(os.getenv("FEED_PAGE_SIZE", 20))
+FEED_MAX_PAGE_SIZE = int(os.getenv("FEED_MAX_PAGE_SIZE", 100))
+# user_id que puede ir en una clave de cache (ids de userauth y de tests)
+_USER_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def page_params(
+    limit: Optional[int],
+    after: Optional[str]
+) -> Tuple[int, Optional[ObjectId]]:
+    """
+    Normaliza los parámetros de paginación:
+      - limit se acota a [1, FEED_MAX_PAGE_SIZE] (None → FEED_PAGE_SIZE)
+      - after es el id de la última receta de la página anterior
+
+    Lanza HTTPException 400 si el cursor no es un ObjectId válido.
+    """
+    if limit is None:
+        limit = FEED_PAGE_SIZE
+    limit = max(1, min(int(limit), FEED_MAX_PAGE_SIZE))
+
+    if not after:
+        return limit, None
+    try:
+        return limit, ObjectId(after)
+    except Exception:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "`after` no es un cursor válido")
+
+
+def feed_user_id(user_id: Optional[str]) -> str:
+    """
+    Valida el user_id de un feed antes de meterlo en la clave de cache:
+    con ':' u otros separadores podría apuntar a la página de otro feed.
+
+    Lanza HTTPException 400 si no es un id válido.
+    """
+    if not user_id or not _USER_ID.fullmatch(user_id):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "`user_id` no es un ID válido")
+    return user_id
+
+
+async def find_page(
+    coll,
+    query: Dict[str, Any],
+    limit: int,
+    after: Optional[ObjectId],
+    projection: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Paginación keyset sobre _id descendente (más recientes primero).
+    El ObjectId incluye la fecha de creación, así que no hace falta
+    un skip(): cada página arranca justo después del cursor.
+    """
+    if after is not None:
+        query = {**query, "_id": {"$lt": after}}
+    cursor = coll.find(query, projection).sort("_id", -1).limit(limit)
+    return await cursor.to_list(limit)
+
+
+def next_cursor(items: List[Dict[str, Any]], limit: int) -> Optional[str]:
+    """Cursor de la siguiente página, o None si esta es la última."""
+    if len(items) < limit:
+        return None
+    return items[-1]["id"]
+
+
+def page_cache_key(prefix: str, limit: int, after: Optional[ObjectId]) -> str:
+    """Clave de cache por página: {prefix}:{limit}:{cursor|first}."""
+    return f"{prefix}:{limit}:{after or 'first'}"
@@ -2,7 +2,13 @@ import strawberry
 from typing import List, Optional
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument
 from app.db import get_collection
+from app.pagination import page_params, find_page
+from app.cache_client import invalidate_tags
+from app.cache_tags import FEED, user_tag, recipe_tag, comments_tag
+from app.likes import add_like, remove_like, get_likes_counts
+from app.search import search_recipes
 from fastapi import HTTPException, Request
 from pydantic import BaseModel, Field
 from typing import List, Optional
@@ -44,6 +50,23 @@ class Recipe:
     portions: int
     steps: List[str]
     user_id: str
+    # Contador denormalizado (ver app/likes.py): like/unlike invalidan
+    # recipe:{id}, pero puede desviarse hasta la siguiente reconciliación.
+    # likesCount lee el mismo contador, así que tampoco es exacto.
+    likes_count: int = 0
+
+@strawberry.type
+class RecipeSummary:
+    """Receta en un listado (feeds, búsqueda): ver RECIPE_SUMMARY_PROJECTION."""
+    id: str
+    title: str
+    description: str
+    # Solo la primera imagen (la portada)
+    images: Optional[List[str]] = None
+    prep_time: str
+    portions: int
+    user_id: str
+    likes_count: int = 0
 
 @strawberry.input
 class RecipeInput:
@@ -66,12 +89,14 @@ class Comment:
     created_at: str
 
     @strawberry.field
-    async def replies(self) -> List["Comment"]:
-        coll = get_collection("comments")
-        raw = await coll.find({"parent_id": self.id}).to_list(100)
+    async def replies(self, info) -> List["Comment"]:
+        # Las replies de todos los comentarios resueltos en la misma
+        # petición se piden juntas con un único $in (ver app/loaders.py)
+        raw = await info.context["replies_loader"].load(self.id)
         out: List[Comment] = []
         for doc in raw:
-            # 1) Mapea el _id
+            # 1) Mapea el _id (copia: el DataLoader cachea los docs)
+            doc = dict(doc)
             doc["id"] = str(doc.pop("_id"))
             doc.setdefault("recipe_id", self.recipe_id)
             doc.setdefault("user_id", "")
@@ -93,6 +118,17 @@ class Like:
 class LikeCount:
     count: int
 
+@strawberry.type
+class RecipeLikeCount:
+    recipe_id: str
+    count: int
+
+@strawberry.type
+class RecipeSearchPage:
+    items: List[RecipeSummary]
+    # Cursor opaco para `after` de la siguiente página (None en la última)
+    next_cursor: Optional[str] = None
+
 # -------------------------
 # Resolutores de consulta
 # -------------------------
@@ -101,9 +137,15 @@ class LikeCount:
 class Query:
 
     @strawberry.field
-    async def recipes(self) -> List[Recipe]:
+    async def recipes(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[str] = None
+    ) -> List[Recipe]:
+        # Paginación keyset: `after` es el id de la última receta recibida
+        limit, after_oid = page_params(limit, after)
         coll = get_collection("recipes")
-        raw_docs = await coll.find({}).to_list(100)
+        raw_docs = await find_page(coll, {}, limit, after_oid)
         recipes: List[Recipe] = []
         for doc in raw_docs:
             doc["id"] = str(doc.pop("_id"))
@@ -146,14 +188,25 @@ class Query:
     # (Opcional) Sólo el conteo de likes
     @strawberry.field
     async def likesCount(self, recipe_id: str) -> LikeCount:
-        coll = get_collection("likes")
-        cnt = await coll.count_documents({"recipe_id": recipe_id})
-        return LikeCount(count=cnt)
+        counts = await get_likes_counts([recipe_id])
+        return LikeCount(count=counts.get(recipe_id, 0))
+
+    # Conteos de varias recetas con una sola consulta
+    @strawberry.field
+    async def likesCounts(self, recipe_ids: List[str]) -> List[RecipeLikeCount]:
+        counts = await get_likes_counts(recipe_ids)
+        return [RecipeLikeCount(recipe_id=rid, count=counts.get(rid, 0)) for rid in recipe_ids]
 
     @strawberry.field
-    async def recipes_by_user(self, user_id: str) -> List[Recipe]:
+    async def recipes_by_user(
+        self,
+        user_id: str,
+        limit: Optional[int] = None,
+        after: Optional[str] = None
+    ) -> List[Recipe]:
+        limit, after_oid = page_params(limit, after)
         coll = get_collection("recipes")
-        raw_docs = await coll.find({"user_id": user_id}).to_list(100)
+        raw_docs = await find_page(coll, {"user_id": user_id}, limit, after_oid)
         recipes: List[Recipe] = []
         for doc in raw_docs:
             doc["id"] = str(doc.pop("_id"))
@@ -162,6 +215,20 @@ class Query:
             recipes.append(Recipe(**doc))
         return recipes
 
+    # Búsqueda de texto completo por relevancia (ver app/search.py)
+    @strawberry.field
+    async def search_recipes(
+        self,
+        q: str,
+        limit: Optional[int] = None,
+        after: Optional[str] = None
+    ) -> RecipeSearchPage:
+        page, _ = await search_recipes(q, limit, after)
+        return RecipeSearchPage(
+            items=[RecipeSummary(**r) for r in page["items"]],
+            next_cursor=page["next"],
+        )
+
 # -------------------------
 # Resolutores de mutación
 # -------------------------
@@ -175,25 +242,39 @@ class Mutation:
         coll = get_collection("recipes")
         doc = recipe.__dict__
         doc["user_id"] = user_id
+        doc["likes_count"] = 0
         res = await coll.insert_one(doc)
-        new = await coll.find_one({"_id": res.inserted_id})
-        new["id"] = str(new.pop("_id"))
-        return Recipe(**new)
+        await invalidate_tags([FEED, user_tag(user_id)])
+        # insert_one añadió el _id al propio doc: no hace falta releerlo
+        doc.pop("_id", None)
+        doc["id"] = str(res.inserted_id)
+        return Recipe(**doc)
 
     @strawberry.mutation
     async def update_recipe(self, info, id: str, recipe: RecipeInput) -> Optional[Recipe]:
         user_id = get_current_user_id(info)
         coll = get_collection("recipes")
         oid = ObjectId(id)
-        # Verificar autor
-        orig = await coll.find_one({"_id": oid})
-        if not orig:
-            return None
-        if str(orig.get("user_id")) != user_id:
-            raise HTTPException(status_code=403, detail="Forbidden")
         update_data = recipe.__dict__
-        await coll.update_one({"_id": oid}, {"$set": update_data})
-        doc = await coll.find_one({"_id": oid})
+        # Actualizar solo si es el autor (las recetas iniciales guardan el
+        # user_id como número)
+        authors = [user_id, int(user_id)] if user_id.isdigit() else [user_id]
+        doc = await coll.find_one_and_update(
+            {"_id": oid, "user_id": {"$in": authors}},
+            {"$set": update_data},
+            return_document=ReturnDocument.AFTER
+        )
+        if doc is None:
+            # ¿no existe o no eres el autor?
+            if not await coll.find_one({"_id": oid}, {"_id": 1}):
+                return None
+            raise HTTPException(status_code=403, detail="Forbidden")
+        # Detalle y páginas que contienen la receta (y el feed del nuevo
+        # autor si cambia user_id)
+        tags = [recipe_tag(id)]
+        if str(update_data.get("user_id")) != user_id:
+            tags.append(user_tag(update_data["user_id"]))
+        await invalidate_tags(tags)
         doc["id"] = str(doc.pop("_id"))
         return Recipe(**doc)
 
@@ -203,6 +284,8 @@ class Mutation:
         coll = get_collection("recipes")
         oid = ObjectId(id)
         res = await coll.delete_one({"_id": oid, "user_id": user_id})
+        if res.deleted_count == 1:
+            await invalidate_tags([recipe_tag(id)])
         return res.deleted_count == 1
 
     @strawberry.mutation
@@ -215,15 +298,17 @@ class Mutation:
     ) -> Comment:
         user_id = get_current_user_id(info)
         coll = get_collection("comments")
-        res = await coll.insert_one({
+        doc = {
             "recipe_id": recipe_id,
             "user_id": user_id,
             "content": content,
             "parent_id": parent_id,
             "created_at": datetime.utcnow().isoformat()
-        })
-        doc = await coll.find_one({"_id": res.inserted_id})
-        doc["id"] = str(doc.pop("_id"))
+        }
+        res = await coll.insert_one(doc)
+        await invalidate_tags([comments_tag(recipe_id)])
+        doc.pop("_id", None)
+        doc["id"] = str(res.inserted_id)
         return Comment(**doc)
     @strawberry.mutation
     async def delete_comment(
@@ -240,12 +325,14 @@ class Mutation:
             raise HTTPException(status_code=400, detail="`comment_id` inválido")
 
         coll = get_collection("comments")
-        # 2) Intentar borrar solo si coincide user_id
-        res = await coll.delete_one({"_id": oid, "user_id": user_id})
-        if res.deleted_count == 0:
+        # 2) Intentar borrar solo si coincide user_id (devuelve el doc
+        #    borrado para saber qué receta invalidar)
+        deleted = await coll.find_one_and_delete({"_id": oid, "user_id": user_id})
+        if deleted is None:
             # o no existe o no eres autor
             raise HTTPException(status_code=404, detail="Comentario no encontrado o no tienes permiso")
 
+        await invalidate_tags([comments_tag(deleted["recipe_id"])])
         return True
     @strawberry.mutation
     async def update_comment(
@@ -263,25 +350,24 @@ class Mutation:
             raise HTTPException(status_code=400, detail="`comment_id` inválido")
 
         coll = get_collection("comments")
-        # 2) Recuperar el comentario
-        doc = await coll.find_one({"_id": oid})
-        if not doc:
-            raise HTTPException(status_code=404, detail="Comentario no existe")
-        # 3) Verificar autoría
-        if doc.get("user_id") != user_id:
-            raise HTTPException(status_code=403, detail="No puedes editar este comentario")
-
-        # 4) Actualizar el contenido y la fecha (opcional)
-        await coll.update_one(
-            {"_id": oid},
+        # 2) Actualizar el contenido solo si eres el autor, recibiendo el
+        #    documento ya actualizado
+        updated = await coll.find_one_and_update(
+            {"_id": oid, "user_id": user_id},
             {"$set": {
                 "content": content,
                 # podrías también actualizar un campo `updated_at`: datetime.utcnow().isoformat()
-            }}
+            }},
+            return_document=ReturnDocument.AFTER
         )
+        # 3) Si no se actualizó: ¿no existe o no eres el autor?
+        if updated is None:
+            if not await coll.find_one({"_id": oid}, {"_id": 1}):
+                raise HTTPException(status_code=404, detail="Comentario no existe")
+            raise HTTPException(status_code=403, detail="No puedes editar este comentario")
+        await invalidate_tags([comments_tag(updated["recipe_id"])])
 
-        # 5) Leer de vuelta y devolver
-        updated = await coll.find_one({"_id": oid})
+        # 4) Devolver
         updated["id"] = str(updated.pop("_id"))
         return Comment(**updated)
 
@@ -289,26 +375,19 @@ class Mutation:
     @strawberry.mutation
     async def likeRecipe(self, info, recipe_id: str) -> Like:
         user_id = get_current_user_id(info)
-        coll = get_collection("likes")
-        # 1) Evitar duplicados
-        if await coll.find_one({"recipe_id": recipe_id, "user_id": user_id}):
+        # Upsert atómico sobre el índice único (recipe_id, user_id)
+        doc = await add_like(recipe_id, user_id)
+        if doc is None:
             raise HTTPException(status_code=409, detail="Already liked")
-        # 2) Insertar
-        res = await coll.insert_one({
-            "recipe_id": recipe_id,
-            "user_id": user_id,
-            "created_at": datetime.utcnow().isoformat()
-        })
-        doc = await coll.find_one({"_id": res.inserted_id})
-        doc["id"] = str(doc.pop("_id"))
+        # likes_count del detalle y de las páginas que contienen la receta
+        await invalidate_tags([recipe_tag(recipe_id)])
         return Like(**doc)
 
     # Quitar like
     @strawberry.mutation
     async def unlikeRecipe(self, info, recipe_id: str) -> bool:
         user_id = get_current_user_id(info)
-        coll = get_collection("likes")
-        res = await coll.delete_one({"recipe_id": recipe_id, "user_id": user_id})
-        if res.deleted_count == 0:
+        if not await remove_like(recipe_id, user_id):
             raise HTTPException(status_code=404, detail="Like not found")
+        await invalidate_tags([recipe_tag(recipe_id)])
         return True
\ No newline at end of file
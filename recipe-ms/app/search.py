@@ -0,0 +1,138 @@
+# app/search.py
+import os
+import re
+import base64
+import hashlib
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from fastapi import HTTPException, status
+from app.db import get_collection
+from app.pagination import FEED_PAGE_SIZE, FEED_MAX_PAGE_SIZE
+from app.cache_client import cache_get_or_set
+from app.cache_tags import FEED, page_tags
+from app.utils import RECIPE_SUMMARY_PROJECTION, prepare_recipe_summaries
+
+# Búsqueda de recetas sobre el índice de texto de recipes (title,
+# description, ingredients; idioma spanish, ver app/indexes.py).
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 60))
+SEARCH_MAX_QUERY_LEN = int(os.getenv("SEARCH_MAX_QUERY_LEN", 100))
+
+_SPACES = re.compile(r"\s+")
+
+# RECIPE_SUMMARY_PROJECTION en sintaxis de $project (el $slice de find no
+# existe en agregación)
+_SUMMARY_FIELDS: Dict[str, Any] = {
+    **RECIPE_SUMMARY_PROJECTION,
+    # Sin imágenes → null, igual que {"$slice": 1} en los feeds
+    "images": {"$slice": ["$images", 1]},
+}
+
+
+def normalize_query(q: Optional[str]) -> str:
+    """
+    Forma canónica de la búsqueda, para que consultas equivalentes para
+    $text compartan entrada de cache: minúsculas, sin tildes (el índice
+    de texto ya ignora mayúsculas y diacríticos), espacios colapsados y,
+    si no hay frases entre comillas, términos sin repetir y ordenados
+    ($text une los términos con OR, el orden no cambia el resultado).
+
+    Lanza HTTPException 400 si queda vacía o es demasiado larga.
+    """
+    q = unicodedata.normalize("NFKD", q or "")
+    q = "".join(c for c in q if not unicodedata.combining(c)).lower()
+    q = _SPACES.sub(" ", q).strip()
+    if '"' not in q:
+        q = " ".join(sorted(set(q.split(" "))))
+    if not q:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Debe indicar un texto de búsqueda `q`")
+    if len(q) > SEARCH_MAX_QUERY_LEN:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            f"`q` no puede superar {SEARCH_MAX_QUERY_LEN} caracteres"
+        )
+    return q
+
+
+def encode_cursor(score: float, oid: str) -> str:
+    """Cursor opaco de la siguiente página: (score, _id) del último resultado."""
+    return base64.urlsafe_b64encode(f"{score!r}:{oid}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(after: Optional[str]) -> Optional[Tuple[float, ObjectId]]:
+    """Lanza HTTPException 400 si el cursor no es uno de encode_cursor."""
+    if not after:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(after + "=" * (-len(after) % 4)).decode()
+        score, oid = raw.split(":", 1)
+        return float(score), ObjectId(oid)
+    except Exception:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "`after` no es un cursor válido")
+
+
+async def find_search_page(
+    query: str,
+    limit: int,
+    after: Optional[Tuple[float, ObjectId]]
+) -> Dict[str, Any]:
+    """
+    Una página de resultados por relevancia (textScore desc, _id desc).
+    La paginación es keyset sobre (score, _id), así que no hay skip():
+    la página N cuesta lo mismo que la primera.
+    """
+    pipeline: List[Dict[str, Any]] = [
+        {"$match": {"$text": {"$search": query}}},
+        {"$addFields": {"_score": {"$meta": "textScore"}}},
+    ]
+    if after is not None:
+        score, oid = after
+        pipeline.append({"$match": {"$or": [
+            {"_score": {"$lt": score}},
+            {"_score": score, "_id": {"$lt": oid}},
+        ]}})
+    pipeline += [
+        {"$sort": {"_score": -1, "_id": -1}},
+        {"$limit": limit},
+        # solo el resumen de cada receta, como en los feeds
+        {"$project": {**_SUMMARY_FIELDS, "_score": 1}},
+    ]
+    docs = await get_collection("recipes").aggregate(pipeline).to_list(limit)
+
+    next_cursor = None
+    if len(docs) == limit:
+        next_cursor = encode_cursor(docs[-1]["_score"], str(docs[-1]["_id"]))
+    items = prepare_recipe_summaries(docs, ensure_fields={"description": "", "user_id": ""})
+    return {"items": items, "next": next_cursor}
+
+
+def search_cache_key(query: str, limit: int, after: Optional[str]) -> str:
+    """recipes:search:summary:{hash de la búsqueda normalizada}:{limit}:{cursor|first}."""
+    digest = hashlib.sha1(query.encode()).hexdigest()[:16]
+    return f"recipes:search:summary:{digest}:{limit}:{after or 'first'}"
+
+
+async def search_recipes(
+    q: Optional[str],
+    limit: Optional[int],
+    after: Optional[str]
+) -> Tuple[Dict[str, Any], str]:
+    """
+    Página de búsqueda cacheada. Devuelve ({"items", "next"}, X-Cache).
+
+    Las páginas llevan la etiqueta del feed (una receta nueva puede entrar
+    en los resultados) y las de sus recetas; una edición que haga que una
+    receta empiece a coincidir se ve como mucho SEARCH_CACHE_TTL tarde.
+    """
+    query = normalize_query(q)
+    limit = max(1, min(int(limit or FEED_PAGE_SIZE), FEED_MAX_PAGE_SIZE))
+    cursor = decode_cursor(after)
+
+    async def load():
+        return await find_search_page(query, limit, cursor)
+
+    build_tags = page_tags(FEED)
+    return await cache_get_or_set(
+        search_cache_key(query, limit, after), SEARCH_CACHE_TTL, load,
+        tags=lambda page: build_tags(page["items"])
+    )
@@ -1,20 +1,32 @@
 # app/utils.py
-from typing import List, Tuple, Dict, Any
-from app.schema import Recipe
+from typing import List, Dict, Any
 
-def prepare_recipes(
+# Proyección de los listados (feeds y búsqueda): solo lo que pinta una
+# tarjeta de receta en recipy-frontend. steps, video y el resto de imágenes se piden al abrir
+# el detalle (/graphql/recipes/{id}), así que ni viajan desde Mongo ni se
+# serializan ni ocupan Redis por cada receta de cada página cacheada.
+RECIPE_SUMMARY_PROJECTION: Dict[str, Any] = {
+    "title":       1,
+    "description": 1,
+    "images":      {"$slice": 1},
+    "prep_time":   1,
+    "portions":    1,
+    "user_id":     1,
+    "likes_count": 1,
+}
+
+
+def prepare_recipe_summaries(
     raw_docs: List[Dict[str, Any]],
     ensure_fields: Dict[str, Any] = None
-) -> Tuple[List[Dict[str, Any]], List[Recipe]]:
+) -> List[Dict[str, Any]]:
     """
-    Transforma raw_docs de Mongo en:
-      - data_to_cache: lista de dicts JSON-serializables
-      - models: lista de Recipe(**doc)
+    Transforma raw_docs de Mongo (leídos con RECIPE_SUMMARY_PROJECTION) en
+    dicts JSON-serializables para la cache y para RecipeSummary(**doc).
 
     ensure_fields: pares clave:valor para setdefault() en cada doc.
     """
-    data_to_cache = []
-    models = []
+    summaries = []
     for doc in raw_docs:
         # _id → id
         doc["id"] = str(doc.pop("_id"))
@@ -24,20 +36,15 @@ def prepare_recipes(
             for field, default in ensure_fields.items():
                 doc.setdefault(field, default)
 
-        # Construcción del dict plano para cache
-        data_to_cache.append({
+        summaries.append({
             "id":          doc["id"],
             "user_id":     doc.get("user_id"),
             "title":       doc.get("title"),
             "description": doc.get("description"),
+            "images":      doc.get("images"),
             "prep_time":   doc.get("prep_time"),
             "portions":    doc.get("portions"),
-            "steps":       doc.get("steps"),
-            "images":      doc.get("images"),
-            "video":       doc.get("video"),
+            "likes_count": doc.get("likes_count", 0),
         })
 
-        # Instancia Recipe para la respuesta
-        models.append(Recipe(**doc))
-
-    return data_to_cache, models
+    return summaries
@@ -0,0 +1,115 @@
+# recipe-ms/tests/conftest.py
+
+import os
+import sys
+
+# metemos recipe-ms/ en el path antes de importar app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# ----------------------------------------------------------------------------
+# Para tests locales: Mongo en localhost y una BD propia para no pisar datos
+# ----------------------------------------------------------------------------
+os.environ.setdefault("MONGO_URL", os.getenv("MONGO_URL_LOCAL", "mongodb://localhost:27017/recipy_test"))
+os.environ.setdefault("FEED_CACHE_TTL", "60")
+
+import httpx
+import pytest
+from pymongo import MongoClient, monitoring
+from pymongo.errors import PyMongoError
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import app.db
+import app.main
+from app.indexes import ensure_indexes
+import app.schema
+
+# Comandos que suponen un round trip a Mongo (no cuentan handshakes,
+# heartbeats ni autenticación)
+ROUND_TRIP_COMMANDS = {
+    "find", "getMore", "insert", "update", "delete",
+    "findAndModify", "aggregate", "count",
+}
+
+
+# ----------------------------------------------------------------------------
+# Si Mongo no está accesible, saltamos los tests que lo usan (fixture mongo,
+# directa o a través de client)
+# ----------------------------------------------------------------------------
+def _mongo_available() -> bool:
+    try:
+        MongoClient(os.environ["MONGO_URL"], serverSelectionTimeoutMS=1000).admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+
+def pytest_collection_modifyitems(config, items):
+    if _mongo_available():
+        return
+    skip = pytest.mark.skip(reason="MongoDB no accesible: omitiendo tests de recipe-ms")
+    for item in items:
+        if "mongo" in getattr(item, "fixturenames", ()):
+            item.add_marker(skip)
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Registra, en orden, los comandos CRUD que el cliente envía a Mongo."""
+
+    def __init__(self):
+        self.names = []
+
+    def started(self, event):
+        if event.command_name in ROUND_TRIP_COMMANDS:
+            self.names.append(event.command_name)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def reset(self):
+        self.names = []
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def commands():
+    return CommandCounter()
+
+
+@pytest.fixture
+async def mongo(commands, monkeypatch):
+    """
+    Cliente motor propio por test (del event loop del test) con el
+    contador de comandos, sobre una BD vacía.
+    """
+    motor = AsyncIOMotorClient(os.environ["MONGO_URL"], event_listeners=[commands])
+    db = motor.get_default_database()
+    for name in ("recipes", "comments", "likes"):
+        await db[name].delete_many({})
+    monkeypatch.setattr(app.db, "db", db)
+    await ensure_indexes()
+    commands.reset()
+    yield db
+    motor.close()
+
+
+@pytest.fixture(autouse=True)
+def no_cache_invalidation(monkeypatch):
+    """Las escrituras no hablan con la cache-API durante los tests."""
+    async def invalidate_tags(tags):
+        return []
+    monkeypatch.setattr(app.main, "invalidate_tags", invalidate_tags)
+    monkeypatch.setattr(app.schema, "invalidate_tags", invalidate_tags)
+
+
+@pytest.fixture
+async def client(mongo):
+    transport = httpx.ASGITransport(app=app.main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
@@ -0,0 +1,60 @@
+"""
+Circuit breaker de la cache: una llamada de sondeo en half_open que se
+cancela no puede dejar el breaker bloqueado (probing=True para siempre).
+"""
+import asyncio
+
+import pytest
+
+import app.cache_client as cache_client
+from app.cache_client import CacheUnavailable, CircuitBreaker
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeBackend:
+    """Backend cuyo get falla, se queda colgado o responde según `mode`."""
+
+    def __init__(self):
+        self.mode = "fail"
+        self.started = asyncio.Event()
+
+    async def get(self, key):
+        self.started.set()
+        if self.mode == "fail":
+            raise ConnectionError("cache caída")
+        if self.mode == "hang":
+            await asyncio.Event().wait()
+        return {"key": key}
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    fake = FakeBackend()
+    monkeypatch.setattr(cache_client, "_backend", fake)
+    # se abre al primer fallo y pasa a half_open en la siguiente llamada
+    monkeypatch.setattr(cache_client, "_breaker", CircuitBreaker(failures=1, reset_s=0))
+    return fake
+
+
+async def test_cancelled_probe_releases_half_open(backend):
+    breaker = cache_client._breaker
+    with pytest.raises(CacheUnavailable):
+        await cache_client._call("get", "k")
+    assert breaker.state == "open"
+
+    # el sondeo se cancela mientras espera a la cache
+    backend.mode = "hang"
+    backend.started.clear()
+    probe = asyncio.create_task(cache_client._call("get", "k"))
+    await backend.started.wait()
+    assert breaker.state == "half_open" and breaker.probing
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+    assert breaker.state == "half_open" and not breaker.probing
+
+    # la siguiente llamada puede sondear y, si va bien, cierra el breaker
+    backend.mode = "ok"
+    assert await cache_client._call("get", "k") == {"key": "k"}
+    assert breaker.state == "closed"
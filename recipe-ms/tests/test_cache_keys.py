@@ -0,0 +1,129 @@
+"""
+Claves de cache en las URLs de la cache-API: HttpCacheBackend las escapa
+por completo y recipy-cache las recibe con rutas {key:path}, así que '#',
+'?', '/' o '%' no pueden cortar la clave ni llevar a otra ruta (una
+página escrita bajo la clave de otro feed).
+"""
+import ast
+import os
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException, Request, Response
+
+from app.cache_backends import HttpCacheBackend
+from app.pagination import feed_user_id
+
+pytestmark = pytest.mark.anyio
+
+RECIPY_CACHE_MAIN = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "..", "..", "recipy-cache", "app", "main.py"
+))
+
+KEYS = [
+    "recipes:user_feed:summary:victim:20:first#x",
+    "recipes:search:a?b=1&c",
+    "recipes:raw/../detail/1",
+    "recipes:100%2F%zz",
+]
+
+
+def _routes():
+    """(método, ruta) de los decoradores @app.<método>(...) de recipy-cache, en orden."""
+    tree = ast.parse(open(RECIPY_CACHE_MAIN, encoding="utf-8").read())
+    routes = []
+    for node in tree.body:
+        for dec in getattr(node, "decorator_list", []):
+            if isinstance(dec, ast.Call) and isinstance(dec.func, ast.Attribute) and dec.args:
+                routes.append((dec.func.attr, dec.args[0].value))
+    return routes
+
+
+def test_cache_api_routes_take_any_key():
+    routes = _routes()
+    for route in [
+        ("get", "/cache/{key:path}"), ("delete", "/cache/{key:path}"),
+        ("get", "/cache/raw/{key:path}"), ("put", "/cache/raw/{key:path}"),
+        ("delete", "/cache/prefix/{prefix:path}"),
+        ("post", "/lock/{key:path}"), ("delete", "/lock/{key:path}"),
+    ]:
+        assert route in routes
+    # las rutas concretas antes que la genérica, que también las casaría
+    assert routes.index(("get", "/cache/raw/{key:path}")) < routes.index(("get", "/cache/{key:path}"))
+    assert routes.index(("delete", "/cache/prefix/{prefix:path}")) < routes.index(("delete", "/cache/{key:path}"))
+
+
+def fake_cache_api():
+    """Misma forma de rutas que recipy-cache, sobre un dict."""
+    api = FastAPI()
+    store, locks = {}, {}
+
+    @api.get("/cache/raw/{key:path}")
+    async def get_raw(key: str):
+        if not isinstance(store.get(key), bytes):
+            raise HTTPException(404)
+        return Response(store[key], headers={"X-Cache": "HIT"})
+
+    @api.put("/cache/raw/{key:path}", status_code=201)
+    async def set_raw(key: str, request: Request):
+        store[key] = await request.body()
+
+    @api.get("/cache/{key:path}")
+    async def get(key: str, response: Response):
+        if key not in store or isinstance(store[key], bytes):
+            raise HTTPException(404)
+        response.headers["X-Cache"] = "HIT"
+        return store[key]
+
+    @api.post("/cache", status_code=201)
+    async def set(item: dict):
+        store[item["key"]] = item["value"]
+
+    @api.delete("/cache/{key:path}", status_code=204)
+    async def delete(key: str):
+        if store.pop(key, None) is None:
+            raise HTTPException(404)
+
+    @api.post("/lock/{key:path}", status_code=201)
+    async def lock(key: str):
+        if key in locks:
+            raise HTTPException(409)
+        locks[key] = "t"
+        return {"key": key, "token": "t"}
+
+    @api.delete("/lock/{key:path}", status_code=204)
+    async def unlock(key: str, token: str):
+        if locks.pop(key, None) != token:
+            raise HTTPException(409)
+
+    return api, store, locks
+
+
+async def test_http_backend_roundtrips_any_key():
+    api, store, locks = fake_cache_api()
+    backend = HttpCacheBackend("http://cache-api")
+    backend.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=api))
+
+    for key in KEYS:
+        await backend.set(key, {"key": key}, 60)
+        await backend.set_raw(key + ":raw", key.encode(), 60)
+        assert await backend.get(key) == ({"key": key}, False)
+        assert await backend.get_raw(key + ":raw") == (key.encode(), False)
+
+        token = await backend.lock(key, 1000)
+        assert locks == {key: token}
+        await backend.unlock(key, token)
+
+        await backend.delete([key])
+        assert await backend.get(key) is None
+
+    assert sorted(store) == sorted(k + ":raw" for k in KEYS)
+    await backend.close()
+
+
+def test_feed_user_id():
+    assert feed_user_id("42") == "42"
+    assert feed_user_id("u1") == "u1"
+    for bad in ["", None, "victim:20:first", "a#b", "a/b", "a%23", "x" * 65]:
+        with pytest.raises(HTTPException):
+            feed_user_id(bad)
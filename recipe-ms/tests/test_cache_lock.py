@@ -0,0 +1,101 @@
+"""
+Lock distribuido de las reconstrucciones: las réplicas que no lo
+consiguen esperan el valor de la que lo tiene, pero si esa no guarda nada
+(el loader lanza, p.ej. un 404) dejan de esperar en seguida en vez de
+agotar CACHE_LOCK_WAIT_MS.
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import app.cache_client as cache_client
+from app.cache_client import CircuitBreaker
+
+pytestmark = pytest.mark.anyio
+
+KEY = "test:lock:1"
+
+
+class FakeBackend:
+    """Backend en memoria con locks (SET NX) compartido por las "réplicas"."""
+
+    def __init__(self):
+        self.values = {}
+        self.locks = {}
+
+    async def get(self, key):
+        return (self.values[key], False) if key in self.values else None
+
+    async def set(self, key, value, ttl, stale_ttl=None, tags=None):
+        self.values[key] = value
+
+    async def lock(self, key, ttl_ms):
+        if key in self.locks:
+            return None
+        self.locks[key] = "token"
+        return "token"
+
+    async def unlock(self, key, token):
+        if self.locks.get(key) == token:
+            del self.locks[key]
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    fake = FakeBackend()
+    monkeypatch.setattr(cache_client, "_backend", fake)
+    monkeypatch.setattr(cache_client, "_breaker", CircuitBreaker(failures=5, reset_s=10))
+    monkeypatch.setattr(cache_client, "DISTRIBUTED_LOCK", True)
+    monkeypatch.setattr(cache_client, "LOCK_WAIT_MS", 2000)
+    monkeypatch.setattr(cache_client, "LOCK_POLL_MS", 10)
+    return fake
+
+
+async def _two_replicas(loader):
+    """Dos reconstrucciones de la misma clave como si fueran dos réplicas."""
+    winner = asyncio.create_task(cache_client._rebuild(KEY, 60, loader))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(cache_client._rebuild(KEY, 60, loader))
+    return await asyncio.gather(winner, waiter, return_exceptions=True)
+
+
+async def test_waiter_uses_winner_value(backend):
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    assert await _two_replicas(loader) == [{"ok": True}, {"ok": True}]
+    assert len(calls) == 1
+
+
+async def test_waiter_stops_when_winner_caches_nothing(backend):
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        raise HTTPException(404, "Receta no encontrada")
+
+    start = time.monotonic()
+    results = await _two_replicas(loader)
+    assert [r.status_code for r in results] == [404, 404]
+    # el que esperaba reconstruye él mismo nada más recibir el aviso
+    assert len(calls) == 2
+    assert time.monotonic() - start < 0.5
+    assert backend.locks == {} and KEY not in backend.values
+
+
+async def test_waiter_ignores_older_not_cached_mark(backend):
+    # un aviso de una reconstrucción anterior no corta la espera actual
+    backend.values["nocache:" + KEY] = time.time() - 5
+
+    async def loader():
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    assert await _two_replicas(loader) == [{"ok": True}, {"ok": True}]
@@ -0,0 +1,107 @@
+"""
+Paridad con recipy-cache: el backend Redis directo de cache_client y la
+cache-API leen y escriben las mismas claves, así que el formato de los
+valores y los scripts Lua (tags, locks) tienen que ser idénticos en
+ambos servicios.
+"""
+import ast
+import importlib.util
+import os
+
+import pytest
+
+import app.cache_backends as backends
+import app.cache_codec as local_codec
+
+RECIPY_CACHE = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "recipy-cache", "app"))
+
+
+def _load(module: str, name: str):
+    """Importa recipy-cache/app/<module>.py sin chocar con el paquete app de recipe-ms."""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(RECIPY_CACHE, f"{module}.py"))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def _without_header(path: str) -> str:
+    """Código del módulo sin el bloque de comentarios inicial."""
+    lines = open(path, encoding="utf-8").read().splitlines()
+    while lines and lines[0].startswith("#"):
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+remote_codec = _load("codec", "recipy_cache_codec")
+
+VALUES = [
+    None,
+    [],
+    {"id": "a", "title": "Tortilla", "images": None, "likes_count": 3},
+    [{"id": f"{i:024x}", "title": "Receta " * 40, "steps": ["paso"] * 10} for i in range(20)],
+    "texto con tildes: ñandú",
+]
+
+
+def test_codec_source_is_identical():
+    assert _without_header(local_codec.__file__) == _without_header(remote_codec.__file__)
+
+
+@pytest.mark.parametrize("fmt", ["json", "msgpack"])
+@pytest.mark.parametrize("compression", ["none", "zstd", "lz4"])
+@pytest.mark.parametrize("soft_ttl", [None, 60, -1])
+def test_codec_roundtrip_both_ways(monkeypatch, fmt, compression, soft_ttl):
+    for codec in (local_codec, remote_codec):
+        monkeypatch.setattr(codec, "CACHE_FORMAT", fmt)
+        monkeypatch.setattr(codec, "CACHE_COMPRESSION", compression)
+        monkeypatch.setattr(codec, "COMPRESS_MIN_BYTES", 64)
+
+    for writer, reader in ((local_codec, remote_codec), (remote_codec, local_codec)):
+        for value in VALUES:
+            raw = writer.encode(value, soft_ttl=soft_ttl)
+            if soft_ttl is None:
+                assert raw == reader.encode(value)
+            assert reader.decode(raw) == (value, soft_ttl == -1)
+            assert not reader.is_raw(raw)
+
+        body = b'{"headers":{}}\n' + b"x" * 500
+        raw = writer.encode_raw(body, soft_ttl=soft_ttl)
+        assert reader.is_raw(raw)
+        assert reader.decode_raw(raw) == (body, soft_ttl == -1)
+
+
+@pytest.mark.parametrize("compression", ["none", "zstd"])
+def test_encode_sized_reports_uncompressed_size(monkeypatch, compression):
+    for codec in (local_codec, remote_codec):
+        monkeypatch.setattr(codec, "CACHE_FORMAT", "json")
+        monkeypatch.setattr(codec, "CACHE_COMPRESSION", compression)
+        monkeypatch.setattr(codec, "COMPRESS_MIN_BYTES", 64)
+        for value in VALUES:
+            payload, size = codec.encode_sized(value)
+            assert payload == codec.encode(value)
+            assert size == len(codec.json_dumps(value))
+
+
+def test_codec_reads_legacy_formats():
+    for codec in (local_codec, remote_codec):
+        assert codec.decode(b'{"a": 1}') == ({"a": 1}, False)
+        assert codec.decode(b'swr1|1|[1, 2]') == ([1, 2], True)
+        assert codec.decode_raw(b'{"a": 1}') is None
+
+
+def _string_constants(path: str):
+    """Constantes str de nivel de módulo (NOMBRE = "..."), sin importar el módulo."""
+    tree = ast.parse(open(path, encoding="utf-8").read())
+    return {
+        node.targets[0].id: node.value.value
+        for node in tree.body
+        if isinstance(node, ast.Assign) and len(node.targets) == 1
+        and isinstance(node.targets[0], ast.Name)
+        and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)
+    }
+
+
+@pytest.mark.parametrize("script", ["_SET_TAGGED_SCRIPT", "_INVALIDATE_TAGS_SCRIPT", "_UNLOCK_SCRIPT"])
+def test_lua_scripts_are_identical(script):
+    remote = _string_constants(os.path.join(RECIPY_CACHE, "main.py"))
+    assert getattr(backends, script) == remote[script]
@@ -0,0 +1,75 @@
+"""
+Plan de ejecución de las consultas calientes de recipe-ms: con los índices
+de app/indexes.py ninguna debe recorrer la colección entera (COLLSCAN).
+Si se añade una consulta nueva a un camino caliente, añadirla aquí.
+"""
+import pytest
+from bson import ObjectId
+
+pytestmark = pytest.mark.anyio
+
+
+def _stages(plan):
+    """Todas las etapas de un plan (winningPlan, con sus inputStage(s))."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _stages(value)
+
+
+async def _seed(mongo):
+    recipe_ids = []
+    for i in range(20):
+        res = await mongo["recipes"].insert_one({
+            "user_id": f"u{i % 4}", "title": f"receta {i}", "description": "d",
+            "created_at": i, "likes_count": 0,
+        })
+        recipe_ids.append(str(res.inserted_id))
+    for i, recipe_id in enumerate(recipe_ids):
+        parent = await mongo["comments"].insert_one({
+            "recipe_id": recipe_id, "user_id": "u1", "content": "c",
+            "parent_id": None, "created_at": f"2024-01-{i + 1:02d}",
+        })
+        await mongo["comments"].insert_one({
+            "recipe_id": recipe_id, "user_id": "u2", "content": "r",
+            "parent_id": str(parent.inserted_id), "created_at": f"2024-02-{i + 1:02d}",
+        })
+        await mongo["likes"].insert_one({"recipe_id": recipe_id, "user_id": "u1"})
+    return recipe_ids
+
+
+# (colección, filtro, orden) tal como los lanzan main.py, schema.py,
+# pagination.py, loaders.py y likes.py
+HOT_QUERIES = {
+    "feed": ("recipes", {}, [("_id", -1)]),
+    "feed_next_page": ("recipes", {"_id": {"$lt": ObjectId()}}, [("_id", -1)]),
+    "user_feed": ("recipes", {"user_id": "u1"}, [("_id", -1)]),
+    "user_feed_next_page": ("recipes", {"user_id": "u1", "_id": {"$lt": ObjectId()}}, [("_id", -1)]),
+    "comments": ("comments", {"recipe_id": "R"}, None),
+    "parent_comments": ("comments", {"recipe_id": "R", "parent_id": None}, None),
+    "replies": ("comments", {"parent_id": {"$in": ["P1", "P2"]}}, None),
+    "like": ("likes", {"recipe_id": "R", "user_id": "u1"}, None),
+    "likes_of_recipe": ("likes", {"recipe_id": {"$in": ["R"]}}, None),
+}
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+async def test_hot_query_uses_index(mongo, name):
+    recipe_ids = await _seed(mongo)
+    coll, query, sort = HOT_QUERIES[name]
+    # ids reales para que el planner trabaje con datos que existen
+    query = {k: (recipe_ids[0] if v == "R" else v) for k, v in query.items()}
+    if "recipe_id" in query and isinstance(query["recipe_id"], dict):
+        query["recipe_id"] = {"$in": recipe_ids[:3]}
+
+    cursor = mongo[coll].find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    plan = (await cursor.explain())["queryPlanner"]["winningPlan"]
+
+    stages = set(_stages(plan))
+    assert "COLLSCAN" not in stages, f"{name}: {stages}"
@@ -0,0 +1,79 @@
+"""
+Reconciliación de likes_count: corrige los contadores desviados sin
+pisar los likes que llegan mientras recorre las recetas, y solo la
+ejecuta la réplica que gana el lock.
+"""
+import asyncio
+
+import pytest
+
+import app.likes
+from app.likes import add_like, reconcile_likes_counts
+
+pytestmark = pytest.mark.anyio
+
+
+async def _recipe(mongo, likes_count):
+    res = await mongo["recipes"].insert_one({"user_id": "u1", "title": "t", "likes_count": likes_count})
+    return res.inserted_id
+
+
+async def _count(mongo, oid):
+    return (await mongo["recipes"].find_one({"_id": oid}))["likes_count"]
+
+
+async def test_reconcile_fixes_drift(mongo):
+    drifted = await _recipe(mongo, 5)
+    ok = await _recipe(mongo, 1)
+    await mongo["likes"].insert_one({"recipe_id": str(ok), "user_id": "u1"})
+
+    assert await reconcile_likes_counts() == 1
+    assert await _count(mongo, drifted) == 0
+    assert await _count(mongo, ok) == 1
+
+
+async def test_reconcile_keeps_like_during_pass(mongo, monkeypatch):
+    oid = await _recipe(mongo, 3)
+    likes = mongo["likes"]
+
+    class LikeAfterGroup:
+        """Colección likes cuyo $group va seguido de un like concurrente."""
+        def aggregate(self, pipeline):
+            cursor = likes.aggregate(pipeline)
+
+            class Rows:
+                async def to_list(self, length):
+                    rows = await cursor.to_list(length)
+                    await add_like(str(oid), "u2")
+                    return rows
+            return Rows()
+
+        def __getattr__(self, name):
+            return getattr(likes, name)
+
+    get_collection = app.likes.get_collection
+    monkeypatch.setattr(
+        app.likes, "get_collection",
+        lambda name: LikeAfterGroup() if name == "likes" else get_collection(name)
+    )
+    await reconcile_likes_counts()
+    # 1 like real: ni el 3 desviado ni el 0 del $group anterior al like
+    assert await _count(mongo, oid) == 1
+
+
+async def test_reconcile_loop_runs_only_when_elected(monkeypatch):
+    passes = []
+
+    async def reconcile():
+        passes.append(1)
+        return 0
+
+    monkeypatch.setattr(app.likes, "reconcile_likes_counts", reconcile)
+    for token, expected in ((None, []), ("t", [1])):
+        passes.clear()
+
+        async def lock(key, ttl_ms, token=token):
+            return token
+        monkeypatch.setattr(app.likes, "cache_lock", lock)
+        await asyncio.wait_for(app.likes._reconcile_loop(0), 1)
+        assert passes == expected
@@ -0,0 +1,80 @@
+"""
+Búsqueda de texto completo: orden por relevancia, paginación con cursor
+opaco sin huecos ni duplicados, y normalización de la consulta.
+"""
+import pytest
+
+import app.search
+from app.search import normalize_query
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    """Cada búsqueda va a Mongo: sin páginas de ejecuciones anteriores."""
+    async def passthrough(key, ttl, loader, **kwargs):
+        return await loader(), "MISS"
+    monkeypatch.setattr(app.search, "cache_get_or_set", passthrough)
+
+
+async def _recipes(mongo, titles):
+    await mongo["recipes"].insert_many([
+        {"user_id": "u1", "title": t, "description": "", "prep_time": "10",
+         "portions": 2, "steps": [], "likes_count": 0}
+        for t in titles
+    ])
+
+
+async def test_search_orders_by_relevance(client, mongo):
+    await _recipes(mongo, ["Tortilla de patatas", "Pollo con patatas y más patatas", "Gazpacho"])
+    resp = await client.get("/graphql/search_recipes", params={"q": "patatas"})
+    assert resp.status_code == 200
+    titles = [r["title"] for r in resp.json()]
+    assert titles[0] == "Pollo con patatas y más patatas"
+    assert "Gazpacho" not in titles
+
+
+async def test_search_pagination(client, mongo, commands):
+    await _recipes(mongo, [f"Arroz {'pollo ' * (i % 3)}{i}" for i in range(25)])
+    seen, after = [], None
+    while True:
+        params = {"q": "arroz pollo", "limit": 7}
+        if after:
+            params["after"] = after
+        commands.reset()
+        resp = await client.get("/graphql/search_recipes", params=params)
+        assert resp.status_code == 200
+        # una sola consulta a Mongo por página, sea la primera o la última
+        assert commands.names == ["aggregate"]
+        seen += [r["id"] for r in resp.json()]
+        after = resp.headers.get("X-Next-Cursor")
+        if not after:
+            break
+    assert len(seen) == len(set(seen)) == 25
+
+
+async def test_search_normalizes_query(client, mongo):
+    # misma entrada de cache para búsquedas equivalentes
+    assert normalize_query(" calabacín  CREMA crema") == normalize_query("crema calabacin")
+    assert normalize_query('"Arroz con pollo"') == '"arroz con pollo"'
+
+    await _recipes(mongo, ["Crema de calabacín"])
+    resp = await client.get("/graphql/search_recipes", params={"q": "calabacin"})
+    assert [r["title"] for r in resp.json()] == ["Crema de calabacín"]
+
+
+async def test_search_images_like_feed(client, mongo):
+    # solo la portada, y null sin imágenes: lo mismo que devuelven los feeds
+    await _recipes(mongo, ["Lentejas"])
+    await mongo["recipes"].insert_one({
+        "user_id": "u1", "title": "Lentejas con foto", "description": "", "prep_time": "10",
+        "portions": 2, "steps": [], "images": ["a.jpg", "b.jpg"], "likes_count": 0,
+    })
+    resp = await client.get("/graphql/search_recipes", params={"q": "lentejas"})
+    assert {r["title"]: r["images"] for r in resp.json()} == {"Lentejas": None, "Lentejas con foto": ["a.jpg"]}
+
+
+async def test_search_rejects_bad_input(client, mongo):
+    assert (await client.get("/graphql/search_recipes", params={"q": "  "})).status_code == 400
+    assert (await client.get("/graphql/search_recipes", params={"q": "a", "after": "???"})).status_code == 400
@@ -0,0 +1,180 @@
+"""
+Regresión de latencia: número de comandos que cada escritura envía a
+Mongo. Si un cambio añade un round trip (p.ej. volver a leer el documento
+recién escrito), estos tests fallan.
+"""
+import pytest
+from bson import ObjectId
+
+pytestmark = pytest.mark.anyio
+
+USER = {"id": "u1"}
+
+
+async def _recipe(mongo, user_id="u1"):
+    res = await mongo["recipes"].insert_one({
+        "user_id": user_id, "title": "t", "description": "d", "prep_time": "10",
+        "portions": 2, "steps": ["a"], "images": None, "video": None, "likes_count": 0,
+    })
+    return str(res.inserted_id)
+
+
+async def _comment(mongo, recipe_id, user_id="u1"):
+    res = await mongo["comments"].insert_one({
+        "recipe_id": recipe_id, "user_id": user_id, "content": "c",
+        "parent_id": None, "created_at": "2024-01-01T00:00:00",
+    })
+    return str(res.inserted_id)
+
+
+async def _graphql(client, query):
+    resp = await client.post("/graphql", json={"query": query}, headers=USER)
+    body = resp.json()
+    assert "errors" not in body, body
+    return body["data"]
+
+
+# ----------------------------------------------------------------------------
+# REST
+# ----------------------------------------------------------------------------
+
+async def test_create_recipe(client, mongo, commands):
+    resp = await client.post("/graphql/create_recipe", headers=USER, json={
+        "title": "t", "description": "d", "prep_time": "10", "portions": 2, "steps": ["a"],
+    })
+    assert resp.status_code == 201
+    assert ObjectId.is_valid(resp.json()["id"])
+    assert commands.names == ["insert"]
+
+
+async def test_create_comment(client, mongo, commands):
+    recipe_id = await _recipe(mongo)
+    commands.reset()
+    resp = await client.post("/graphql/comments_recipes", headers=USER, json={
+        "recipe_id": recipe_id, "content": "hola",
+    })
+    assert resp.status_code == 201
+    assert resp.json()["content"] == "hola"
+    # existencia de la receta + insert
+    assert commands.names == ["find", "insert"]
+
+
+async def test_update_comment(client, mongo, commands):
+    comment_id = await _comment(mongo, await _recipe(mongo))
+    commands.reset()
+    resp = await client.put(f"/graphql/comments/{comment_id}", headers=USER, json={"content": "nuevo"})
+    assert resp.status_code == 200
+    assert resp.json()["content"] == "nuevo"
+    assert commands.names == ["findAndModify"]
+
+
+async def test_update_comment_forbidden(client, mongo, commands):
+    comment_id = await _comment(mongo, await _recipe(mongo), user_id="otro")
+    commands.reset()
+    resp = await client.put(f"/graphql/comments/{comment_id}", headers=USER, json={"content": "nuevo"})
+    assert resp.status_code == 403
+    # solo el camino de error paga la consulta extra para distinguir 403/404
+    assert commands.names == ["findAndModify", "find"]
+
+
+async def test_delete_comment(client, mongo, commands):
+    comment_id = await _comment(mongo, await _recipe(mongo))
+    commands.reset()
+    resp = await client.delete(f"/graphql/comments/{comment_id}", headers=USER)
+    assert resp.status_code == 204
+    # borrado condicionado al autor, devolviendo el doc (para invalidar)
+    assert commands.names == ["findAndModify"]
+
+
+async def test_delete_comment_forbidden(client, mongo, commands):
+    comment_id = await _comment(mongo, await _recipe(mongo), user_id="otro")
+    commands.reset()
+    resp = await client.delete(f"/graphql/comments/{comment_id}", headers=USER)
+    assert resp.status_code == 403
+    assert commands.names == ["findAndModify", "find"]
+    assert await mongo["comments"].count_documents({}) == 1
+
+
+async def test_like_and_unlike(client, mongo, commands):
+    recipe_id = await _recipe(mongo)
+    commands.reset()
+    resp = await client.post(f"/graphql/like_recipe?recipe_id={recipe_id}", headers=USER)
+    assert resp.status_code == 201
+    assert resp.json()["user_id"] == "u1"
+    # existencia de la receta + upsert del like + $inc del contador
+    assert commands.names == ["find", "update", "update"]
+
+    commands.reset()
+    resp = await client.post(f"/graphql/like_recipe?recipe_id={recipe_id}", headers=USER)
+    assert resp.status_code == 409
+    assert commands.names == ["find", "update"]
+
+    commands.reset()
+    resp = await client.delete(f"/graphql/unlike_recipe?recipe_id={recipe_id}", headers=USER)
+    assert resp.status_code == 204
+    assert commands.names == ["delete", "update"]
+
+
+# ----------------------------------------------------------------------------
+# GraphQL
+# ----------------------------------------------------------------------------
+
+async def test_gql_add_recipe(client, mongo, commands):
+    data = await _graphql(client, """
+        mutation { addRecipe(recipe: {title: "t", description: "d", prepTime: "10",
+                                      portions: 2, steps: ["a"], userId: "u1"}) { id title } }
+    """)
+    assert data["addRecipe"]["title"] == "t"
+    assert commands.names == ["insert"]
+
+
+async def test_gql_update_recipe(client, mongo, commands):
+    recipe_id = await _recipe(mongo)
+    commands.reset()
+    data = await _graphql(client, """
+        mutation { updateRecipe(id: "%s", recipe: {title: "t2", description: "d", prepTime: "10",
+                                                   portions: 2, steps: ["a"], userId: "u1"}) { title } }
+    """ % recipe_id)
+    assert data["updateRecipe"]["title"] == "t2"
+    # update condicionado al autor, devolviendo el documento
+    assert commands.names == ["findAndModify"]
+
+
+async def test_gql_update_recipe_forbidden(client, mongo, commands):
+    recipe_id = await _recipe(mongo, user_id="otro")
+    commands.reset()
+    resp = await client.post("/graphql", headers=USER, json={"query": """
+        mutation { updateRecipe(id: "%s", recipe: {title: "t2", description: "d", prepTime: "10",
+                                                   portions: 2, steps: ["a"], userId: "u1"}) { title } }
+    """ % recipe_id})
+    assert resp.json()["errors"]
+    assert commands.names == ["findAndModify", "find"]
+
+
+async def test_gql_comments(client, mongo, commands):
+    recipe_id = await _recipe(mongo)
+    commands.reset()
+    data = await _graphql(client, 'mutation { addComment(recipeId: "%s", content: "c") { id } }' % recipe_id)
+    comment_id = data["addComment"]["id"]
+    assert commands.names == ["insert"]
+
+    commands.reset()
+    data = await _graphql(client, 'mutation { updateComment(commentId: "%s", content: "x") { content } }' % comment_id)
+    assert data["updateComment"]["content"] == "x"
+    assert commands.names == ["findAndModify"]
+
+    commands.reset()
+    data = await _graphql(client, 'mutation { deleteComment(commentId: "%s") }' % comment_id)
+    assert data["deleteComment"] is True
+    assert commands.names == ["findAndModify"]
+
+
+async def test_gql_like_and_unlike(client, mongo, commands):
+    recipe_id = await _recipe(mongo)
+    commands.reset()
+    await _graphql(client, 'mutation { likeRecipe(recipeId: "%s") { id } }' % recipe_id)
+    assert commands.names == ["update", "update"]
+
+    commands.reset()
+    await _graphql(client, 'mutation { unlikeRecipe(recipeId: "%s") }' % recipe_id)
+    assert commands.names == ["delete", "update"]
@@ -0,0 +1,157 @@
+# app/codec.py
+import os
+import json
+import time
+from typing import Any, Optional, Tuple
+
+# Librerías opcionales: si no están instaladas se cae a json / sin compresión
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+try:
+    import lz4.frame as lz4
+except ImportError:  # pragma: no cover
+    lz4 = None
+
+# Formato de los valores en Redis (bytes):
+#   rc2|<fmt><comp>|<soft_deadline>|<payload>
+#     fmt:  j = JSON (orjson si está disponible), m = msgpack,
+#           b = bytes opacos (encode_raw: p.ej. un cuerpo HTTP ya serializado)
+#     comp: n = sin comprimir, z = zstd, l = lz4
+#     soft_deadline: epoch en segundos para stale-while-revalidate, o vacío
+# Se siguen leyendo los formatos anteriores:
+#   swr1|<epoch>|<json>   (stale-while-revalidate sin etiqueta de formato)
+#   <json>                (JSON plano)
+_TAG = b"rc2|"
+_RAW_TAG = _TAG + b"b"
+_SWR_TAG = b"swr1|"
+
+CACHE_FORMAT = os.getenv("CACHE_FORMAT", "json").lower()
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "zstd").lower()
+COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", 1024))
+
+if CACHE_FORMAT == "msgpack" and msgpack is None:
+    print("msgpack no instalado: CACHE_FORMAT=json")
+    CACHE_FORMAT = "json"
+if (CACHE_COMPRESSION == "zstd" and zstandard is None) or (CACHE_COMPRESSION == "lz4" and lz4 is None):
+    print(f"{CACHE_COMPRESSION} no instalado: CACHE_COMPRESSION=none")
+    CACHE_COMPRESSION = "none"
+
+_zstd_c = zstandard.ZstdCompressor(level=3) if zstandard else None
+_zstd_d = zstandard.ZstdDecompressor() if zstandard else None
+
+
+def json_dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value).encode()
+
+
+def _json_loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _serialize(value: Any) -> Tuple[bytes, bytes]:
+    if CACHE_FORMAT == "msgpack":
+        return b"m", msgpack.packb(value, use_bin_type=True)
+    return b"j", json_dumps(value)
+
+
+def _compress(payload: bytes) -> Tuple[bytes, bytes]:
+    if len(payload) < COMPRESS_MIN_BYTES or CACHE_COMPRESSION == "none":
+        return b"n", payload
+    if CACHE_COMPRESSION == "zstd":
+        return b"z", _zstd_c.compress(payload)
+    if CACHE_COMPRESSION == "lz4":
+        return b"l", lz4.compress(payload)
+    return b"n", payload
+
+
+def encode(value: Any, soft_ttl: Optional[int] = None) -> bytes:
+    """
+    Serializa 'value' para guardarlo en Redis. Si soft_ttl no es None el
+    valor se considera fresco durante soft_ttl segundos y stale después
+    (hasta que Redis lo expire con el TTL duro).
+    """
+    return encode_sized(value, soft_ttl)[0]
+
+
+def encode_sized(value: Any, soft_ttl: Optional[int] = None) -> Tuple[bytes, int]:
+    """
+    Como encode, y además el tamaño de 'value' serializado sin comprimir
+    (para estadísticas, sin volver a serializarlo).
+    """
+    fmt, payload = _serialize(value)
+    size = len(payload)
+    comp, payload = _compress(payload)
+    deadline = b"" if soft_ttl is None else b"%.3f" % (time.time() + soft_ttl)
+    return b"".join((_TAG, fmt, comp, b"|", deadline, b"|", payload)), size
+
+
+def encode_raw(data: bytes, soft_ttl: Optional[int] = None) -> bytes:
+    """
+    Como encode, pero 'data' se guarda tal cual (solo se comprime): al
+    leerlo con decode_raw se obtienen los mismos bytes sin parsear nada.
+    """
+    comp, payload = _compress(data)
+    deadline = b"" if soft_ttl is None else b"%.3f" % (time.time() + soft_ttl)
+    return b"".join((_RAW_TAG, comp, b"|", deadline, b"|", payload))
+
+
+def is_raw(raw: bytes) -> bool:
+    """True si el valor se guardó con encode_raw (no es un valor JSON)."""
+    return raw.startswith(_RAW_TAG)
+
+
+def _decompress(comp: bytes, payload: bytes) -> bytes:
+    if comp == b"z":
+        return _zstd_d.decompress(payload)
+    if comp == b"l":
+        return lz4.decompress(payload)
+    return payload
+
+
+def decode_raw(raw: bytes) -> Optional[Tuple[bytes, bool]]:
+    """
+    Devuelve (bytes, stale) de un valor guardado con encode_raw, o None
+    si se guardó en otro formato (se trata como un miss).
+    """
+    if not is_raw(raw):
+        return None
+    comp = raw[5:6]
+    deadline, _, payload = raw[7:].partition(b"|")
+    stale = bool(deadline) and float(deadline) < time.time()
+    return _decompress(comp, payload), stale
+
+
+def decode(raw: bytes) -> Tuple[Any, bool]:
+    """Devuelve (valor, stale). No admite valores de encode_raw (ver is_raw)."""
+    stale = False
+    if raw.startswith(_TAG):
+        fmt, comp = raw[4:5], raw[5:6]
+        deadline, _, payload = raw[7:].partition(b"|")
+        stale = bool(deadline) and float(deadline) < time.time()
+        payload = _decompress(comp, payload)
+        if fmt == b"m":
+            return msgpack.unpackb(payload, raw=False), stale
+        return _json_loads(payload), stale
+
+    if raw.startswith(_SWR_TAG):
+        deadline, _, raw = raw[len(_SWR_TAG):].partition(b"|")
+        stale = float(deadline) < time.time()
+    try:
+        return _json_loads(raw), stale
+    except ValueError:
+        # Si no era JSON válido, lo devolvemos como string
+        return raw.decode("utf-8", "replace"), stale
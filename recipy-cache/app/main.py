@@ -1,14 +1,22 @@
-import os, json
-from fastapi import FastAPI, Request, HTTPException, status
+import os, json, secrets
+from fastapi import FastAPI, Request, Response, HTTPException, Query, status
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional
 from app.db import redis
+from app.codec import (
+    encode_sized, decode, encode_raw, decode_raw, is_raw,
+    CACHE_FORMAT, CACHE_COMPRESSION, COMPRESS_MIN_BYTES
+)
+from app.metrics import http_metrics_middleware, key_prefix, record_lookup
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from dotenv import load_dotenv
 app = FastAPI(title="recipe-cache")
 load_dotenv()  # carga REDIS_URL, DEFAULT_CACHE_TTL, API_URL, etc.
+# Latencia por ruta y peticiones en curso (GET /metrics)
+app.middleware("http")(http_metrics_middleware)
 
 # 1. Monta el directorio static (css/js/img) en /static
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -34,41 +42,331 @@ async def ui(request: Request):
 async def health():
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas en formato Prometheus."""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/stats/encoding")
+async def encoding_stats():
+    """
+    Ahorro de memoria del codec por prefijo de clave (desde el arranque
+    de este proceso): bytes serializados sin comprimir (JSON, o msgpack
+    con CACHE_FORMAT=msgpack; en valores raw, los bytes recibidos) frente
+    a los bytes realmente guardados en Redis.
+    """
+    prefixes = {}
+    for prefix, st in sorted(_encoding_stats.items()):
+        saved = st["plain_bytes"] - st["stored_bytes"]
+        prefixes[prefix] = {
+            **st,
+            "saved_bytes": saved,
+            "saved_ratio": round(saved / st["plain_bytes"], 3) if st["plain_bytes"] else 0.0,
+        }
+    return {
+        "format": CACHE_FORMAT,
+        "compression": CACHE_COMPRESSION,
+        "compress_min_bytes": COMPRESS_MIN_BYTES,
+        "prefixes": prefixes,
+    }
+
 class CacheItem(BaseModel):
     key: str
     value: Any
     ttl: Optional[int] = None
+    # Stale-while-revalidate: segundos extra durante los que el valor se
+    # sigue sirviendo (marcado como STALE) una vez vencido 'ttl'.
+    stale_ttl: Optional[int] = None
+    # Etiquetas de dependencia (p.ej. "recipe:123", "user:42"): un
+    # POST /cache/invalidate con cualquiera de ellas borra la clave.
+    tags: Optional[List[str]] = None
+
+class CacheKeys(BaseModel):
+    keys: List[str]
+
+class CacheItems(BaseModel):
+    items: List[CacheItem]
+
+class CacheTags(BaseModel):
+    tags: List[str]
+
+class LockRequest(BaseModel):
+    ttl_ms: int = 5000
 
 DEFAULT_TTL = int(os.getenv("DEFAULT_CACHE_TTL", 60))
+# Canal pub/sub para que los L1 en memoria de los clientes se invaliden
+INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache:invalidate")
+
+async def _publish_invalidation(keys: Optional[List[str]] = None, prefix: Optional[str] = None):
+    """Avisa a las réplicas suscritas de las claves (o prefijo) invalidadas."""
+    message: Dict[str, Any] = {"keys": keys or []}
+    if prefix:
+        message["prefix"] = prefix
+    await redis.publish(INVALIDATION_CHANNEL, json.dumps(message))
+
+# Bytes serializados sin comprimir vs bytes guardados, por prefijo. El
+# tamaño sin comprimir sale del propio encode (no se serializa dos veces)
+_encoding_stats: Dict[str, Dict[str, int]] = {}
 
-@app.get("/cache/{key}")
-async def get_cache(key: str):
-    """Recupera el valor JSON almacenado en Redis bajo 'key'."""
+def _record_encoding(key: str, plain_bytes: int, payload: bytes) -> None:
+    stats = _encoding_stats.setdefault(
+        key_prefix(key), {"writes": 0, "plain_bytes": 0, "stored_bytes": 0}
+    )
+    stats["writes"] += 1
+    stats["plain_bytes"] += plain_bytes
+    stats["stored_bytes"] += len(payload)
+
+def _store_args(item: CacheItem):
+    """(payload, ttl duro en Redis) para un item, con o sin SWR."""
+    ttl = item.ttl if item.ttl is not None else DEFAULT_TTL
+    if item.stale_ttl:
+        (payload, plain_bytes), ttl = encode_sized(item.value, soft_ttl=ttl), ttl + item.stale_ttl
+    else:
+        payload, plain_bytes = encode_sized(item.value)
+    _record_encoding(item.key, plain_bytes, payload)
+    return payload, ttl
+
+# -------------------------------------------------------------------------
+# Etiquetas: set "tag:{tag}" con las claves que dependen de cada etiqueta
+# -------------------------------------------------------------------------
+# SET de la clave + SADD en cada set de etiqueta, de forma atómica. El set
+# vive al menos tanto como la clave más longeva que contiene.
+_SET_TAGGED_SCRIPT = """
+local ttl = tonumber(ARGV[2])
+redis.call('set', KEYS[1], ARGV[1], 'EX', ttl)
+for i = 2, #KEYS do
+    redis.call('sadd', KEYS[i], KEYS[1])
+    if redis.call('ttl', KEYS[i]) < ttl then
+        redis.call('expire', KEYS[i], ttl)
+    end
+end
+return 1
+"""
+
+# Borra las claves de todas las etiquetas y los propios sets en un solo
+# paso atómico; devuelve las claves afectadas.
+_INVALIDATE_TAGS_SCRIPT = """
+local keys = {}
+for i = 1, #KEYS do
+    for _, key in ipairs(redis.call('smembers', KEYS[i])) do
+        keys[#keys + 1] = key
+    end
+    redis.call('del', KEYS[i])
+end
+for i = 1, #keys, 1000 do
+    redis.call('unlink', unpack(keys, i, math.min(i + 999, #keys)))
+end
+return keys
+"""
+
+def _tag_key(tag: str) -> str:
+    return f"tag:{tag}"
+
+def _set_item(target, key: str, tags: Optional[List[str]], payload: bytes, ttl: int):
+    """Encola (pipeline) o ejecuta (cliente) el SET de una clave, con sus tags."""
+    if not tags:
+        return target.set(key, payload, ex=ttl)
+    tag_keys = [_tag_key(t) for t in dict.fromkeys(tags)]
+    return target.eval(_SET_TAGGED_SCRIPT, 1 + len(tag_keys), key, *tag_keys, payload, ttl)
+
+# Las claves van en la ruta escapadas por completo (quote(key, safe=""),
+# ver recipe-ms/app/cache_backends.py) y llegan ya decodificadas, así que
+# pueden contener "/": las rutas usan {key:path} y las concretas
+# (/cache/raw/..., /cache/prefix/...) se registran antes que las genéricas.
+
+# -------------------------------------------------------------------------
+# Valores en bruto: bytes opacos que se devuelven tal cual (p.ej. el cuerpo
+# HTTP ya serializado de una respuesta de recipe-ms), sin json.loads al
+# leer ni JSON que re-serializar al responder.
+# -------------------------------------------------------------------------
+@app.get("/cache/raw/{key:path}")
+async def get_cache_raw(key: str):
+    """
+    Devuelve los bytes guardados con PUT /cache/raw/{key} (404 si no
+    existen o la clave se guardó como valor JSON). X-Cache: HIT o STALE.
+    """
     raw = await redis.get(key)
-    if raw is None:
+    entry = decode_raw(raw) if raw is not None else None
+    if entry is None:
+        record_lookup(key, "MISS")
         raise HTTPException(status_code=404, detail="Key not found")
-    try:
-        return json.loads(raw)
-    except json.JSONDecodeError:
-        # Si no era JSON válido, lo devolvemos como string
-        return raw
+    data, stale = entry
+    cache_status = "STALE" if stale else "HIT"
+    record_lookup(key, cache_status)
+    return Response(
+        content=data, media_type="application/octet-stream",
+        headers={"X-Cache": cache_status}
+    )
+
+@app.put("/cache/raw/{key:path}", status_code=status.HTTP_201_CREATED)
+async def set_cache_raw(
+    key: str,
+    request: Request,
+    ttl: Optional[int] = None,
+    stale_ttl: Optional[int] = None,
+    tags: Optional[List[str]] = Query(None)
+):
+    """
+    Guarda el cuerpo de la petición tal cual bajo 'key'. ttl, stale_ttl
+    y tags (repetible) funcionan igual que en POST /cache.
+    """
+    data = await request.body()
+    ttl = ttl if ttl is not None else DEFAULT_TTL
+    if stale_ttl:
+        payload, ttl = encode_raw(data, soft_ttl=ttl), ttl + stale_ttl
+    else:
+        payload = encode_raw(data)
+    _record_encoding(key, len(data), payload)
+    await _set_item(redis, key, tags, payload, ttl)
+    return {"key": key, "ttl": ttl}
+
+@app.get("/cache/{key:path}")
+async def get_cache(key: str, response: Response):
+    """
+    Recupera el valor JSON almacenado en Redis bajo 'key'.
+    El header X-Cache indica si el valor está fresco (HIT) o ya
+    vencido su soft TTL pero aún servible (STALE).
+    """
+    raw = await redis.get(key)
+    if raw is None or is_raw(raw):
+        record_lookup(key, "MISS")
+        raise HTTPException(status_code=404, detail="Key not found")
+    value, stale = decode(raw)
+    response.headers["X-Cache"] = "STALE" if stale else "HIT"
+    record_lookup(key, response.headers["X-Cache"])
+    return value
+
+@app.post("/cache/mget")
+async def mget_cache(body: CacheKeys):
+    """
+    Recupera varias claves con un único MGET.
+    Devuelve {"values": {key: value}, "missing": [keys sin valor],
+    "stale": [keys servidas tras su soft TTL]}.
+    """
+    if not body.keys:
+        return {"values": {}, "missing": [], "stale": []}
+    raws = await redis.mget(body.keys)
+    values: Dict[str, Any] = {}
+    missing: List[str] = []
+    stale_keys: List[str] = []
+    for key, raw in zip(body.keys, raws):
+        if raw is None or is_raw(raw):
+            missing.append(key)
+            record_lookup(key, "MISS")
+            continue
+        values[key], stale = decode(raw)
+        if stale:
+            stale_keys.append(key)
+        record_lookup(key, "STALE" if stale else "HIT")
+    return {"values": values, "missing": missing, "stale": stale_keys}
+
+@app.post("/cache/mset", status_code=status.HTTP_201_CREATED)
+async def mset_cache(body: CacheItems):
+    """
+    Guarda varios items (cada uno con su TTL) en un único pipeline de Redis.
+    """
+    async with redis.pipeline(transaction=False) as pipe:
+        for item in body.items:
+            _set_item(pipe, item.key, item.tags, *_store_args(item))
+        await pipe.execute()
+    return {"stored": len(body.items)}
+
+@app.post("/cache/mdel")
+async def mdel_cache(body: CacheKeys):
+    """Elimina varias claves con un único DEL. No falla si alguna no existe."""
+    if not body.keys:
+        return {"deleted": 0}
+    deleted = await redis.delete(*body.keys)
+    await _publish_invalidation(keys=body.keys)
+    return {"deleted": deleted}
+
+@app.post("/cache/invalidate")
+async def invalidate_tags(body: CacheTags):
+    """
+    Borra atómicamente todas las claves guardadas con alguna de las
+    etiquetas indicadas y avisa a los L1 de los clientes.
+    """
+    if not body.tags:
+        return {"tags": [], "keys": []}
+    raw = await redis.eval(
+        _INVALIDATE_TAGS_SCRIPT, len(body.tags), *[_tag_key(t) for t in body.tags]
+    )
+    keys = list(dict.fromkeys(k.decode() for k in raw))
+    if keys:
+        await _publish_invalidation(keys=keys)
+    return {"tags": body.tags, "keys": keys}
 
 @app.post("/cache", status_code=status.HTTP_201_CREATED)
 async def set_cache(item: CacheItem):
     """
     Guarda 'value' bajo 'key' con TTL opcional.
-    'value' se serializa a JSON antes de guardar.
+    'value' se serializa a JSON antes de guardar. Con 'stale_ttl',
+    Redis lo conserva ttl + stale_ttl segundos (los últimos como STALE).
+    Con 'tags' la clave queda registrada en el set de cada etiqueta.
     """
-    ttl = item.ttl if item.ttl is not None else DEFAULT_TTL
-    payload = json.dumps(item.value)
-    await redis.set(item.key, payload, ex=ttl)
+    payload, ttl = _store_args(item)
+    await _set_item(redis, item.key, item.tags, payload, ttl)
     return {"key": item.key, "ttl": ttl}
 
-@app.delete("/cache/{key}", status_code=status.HTTP_204_NO_CONTENT)
+def _escape_glob(prefix: str) -> str:
+    """Escapa los comodines de Redis para usar 'prefix' como literal en MATCH."""
+    return "".join("\\" + c if c in "*?[]\\" else c for c in prefix)
+
+@app.delete("/cache/prefix/{prefix:path}")
+async def delete_cache_prefix(prefix: str):
+    """
+    Elimina todas las claves que empiezan por 'prefix'.
+    Usa SCAN (no KEYS) para no bloquear Redis con colecciones grandes.
+    """
+    deleted = 0
+    batch = []
+    async for key in redis.scan_iter(match=_escape_glob(prefix) + "*", count=500):
+        batch.append(key)
+        if len(batch) >= 500:
+            deleted += await redis.unlink(*batch)
+            batch = []
+    if batch:
+        deleted += await redis.unlink(*batch)
+    await _publish_invalidation(prefix=prefix)
+    return {"prefix": prefix, "deleted": deleted}
+
+
+@app.delete("/cache/{key:path}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_cache(key: str):
     """Elimina la clave de Redis."""
     deleted = await redis.delete(key)
+    await _publish_invalidation(keys=[key])
     if deleted == 0:
         raise HTTPException(status_code=404, detail="Key not found")
     return
 
+# -------------------------------------------------------------------------
+# Lock distribuido (single-flight entre réplicas de los clientes)
+# -------------------------------------------------------------------------
+# Borra el lock solo si el token coincide (no liberamos el de otro)
+_UNLOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+@app.post("/lock/{key:path}", status_code=status.HTTP_201_CREATED)
+async def acquire_lock(key: str, body: LockRequest):
+    """
+    Intenta adquirir el lock 'lock:{key}' con SET NX PX.
+    Devuelve el token necesario para liberarlo, o 409 si ya está tomado.
+    """
+    token = secrets.token_hex(16)
+    acquired = await redis.set(f"lock:{key}", token, nx=True, px=body.ttl_ms)
+    if not acquired:
+        raise HTTPException(status_code=409, detail="Lock already held")
+    return {"key": key, "token": token}
+
+@app.delete("/lock/{key:path}", status_code=status.HTTP_204_NO_CONTENT)
+async def release_lock(key: str, token: str):
+    """Libera el lock si 'token' sigue siendo el propietario."""
+    released = await redis.eval(_UNLOCK_SCRIPT, 1, f"lock:{key}", token)
+    if not released:
+        raise HTTPException(status_code=409, detail="Lock not held")
+    return
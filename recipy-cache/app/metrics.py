@@ -0,0 +1,48 @@
+# app/metrics.py
+import time
+from fastapi import Request
+from prometheus_client import Counter, Gauge, Histogram
+
+# Métricas de la cache-API, expuestas en GET /metrics
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "cache_http_request_duration_seconds",
+    "Latencia de las peticiones HTTP por ruta",
+    ["method", "route", "status"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+HTTP_IN_FLIGHT = Gauge(
+    "cache_http_requests_in_flight",
+    "Peticiones HTTP en curso",
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Lecturas por prefijo de clave y resultado (HIT, STALE, MISS)",
+    ["prefix", "result"],
+)
+
+
+def key_prefix(key: str) -> str:
+    """Familia de la clave: 'recipes:detail:123' → 'recipes:detail'."""
+    return ":".join(key.split(":")[:2])
+
+
+def record_lookup(key: str, result: str) -> None:
+    CACHE_LOOKUPS.labels(key_prefix(key), result).inc()
+
+
+async def http_metrics_middleware(request: Request, call_next):
+    """Latencia por ruta (plantilla, no URL concreta) y peticiones en curso."""
+    HTTP_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            request.method, getattr(route, "path", "unmatched"), str(status)
+        ).observe(time.perf_counter() - start)
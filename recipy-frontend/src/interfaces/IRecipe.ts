@@ -10,4 +10,11 @@ export interface IRecipe {
   user_id: string;
 }
 
+// Una página de un feed: nextCursor (header X-Next-Cursor) pide la
+// siguiente con `after`; null en la última
+export interface IRecipePage {
+  recipes: IRecipe[];
+  nextCursor: string | null;
+}
+
 // I moved the QUERY to the service; I think it's better to have it there and not in the interface
@@ -20,11 +20,12 @@ export async function createRecipe(formData: FormData, token: string) {
     return { success: false, error };
   }
 }
-export async function fetchAllRecipes() {
+// Una página del feed; nextCursor se pasa como `after` para la siguiente
+export async function fetchAllRecipes(after?: string) {
   try {
     console.log("Fetching all recipes");
-    const recipes = await RecipeService.fetchAllRecipes();
-    return { success: true, recipes };
+    const { recipes, nextCursor } = await RecipeService.fetchAllRecipes(after);
+    return { success: true, recipes, nextCursor };
   } catch (error) {
     console.error("Error fetching recipes:", error);
     return { success: false, error };
@@ -67,11 +68,11 @@ export async function createComment(
     return { success: false, error };
   }
 }
-export async function fetchUserRecipes(userId: string) {
+export async function fetchUserRecipes(userId: string, after?: string) {
   try {
     console.log("Fetching user recipes for userId:", userId);
-    const recipes = await RecipeService.fetchUserRecipesNA(userId);
-    return { success: true, recipes };
+    const { recipes, nextCursor } = await RecipeService.fetchUserRecipesNA(userId, after);
+    return { success: true, recipes, nextCursor };
   } catch (error) {
     console.error("Error fetching recipes:", error);
     return { success: false, error };
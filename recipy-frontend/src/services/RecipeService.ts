@@ -1,6 +1,9 @@
-import { IRecipe } from "@/interfaces/IRecipe";
+import { IRecipe, IRecipePage } from "@/interfaces/IRecipe";
 import { IComments } from "@/interfaces/IComments";
 import { ILike  } from "@/interfaces/ILike";
+// Recetas por página de feed (recipe-ms lo acota a FEED_MAX_PAGE_SIZE)
+const FEED_PAGE_SIZE = 100;
+
 class RecipeService {
   private apiUrl: string;
 
@@ -11,29 +14,45 @@ class RecipeService {
       throw new Error("WAF_URL no está definido");
     }
   }
-  fetchAllRecipes = async (): Promise<IRecipe[]> => {
-    const url = `${this.apiUrl}/recipe/graphql/get_recipes`;
-    console.log("Fetching all recipes from:", url);
-
-    const response = await fetch(url, {
-      method: "GET",
-      // No necesitas headers de auth si devuelves todo
-    });
+  // Los feeds de recipe-ms van paginados: cada respuesta trae el cursor de
+  // la siguiente página en el header X-Next-Cursor (ausente en la última).
+  // Se pide una sola página; para "cargar más", volver a llamar con
+  // after = nextCursor.
+  private fetchPage = async (
+    url: string,
+    init: RequestInit,
+    errorLabel: string,
+    after?: string
+  ): Promise<IRecipePage> => {
+    const sep = url.includes("?") ? "&" : "?";
+    let pageUrl = `${url}${sep}limit=${FEED_PAGE_SIZE}`;
+    if (after) pageUrl += `&after=${encodeURIComponent(after)}`;
 
+    const response = await fetch(pageUrl, init);
     if (!response.ok) {
       const text = await response.text();
-      console.error("Error fetching recipes:", text);
+      console.error(`${errorLabel}:`, text);
       throw new Error(`Error ${response.status}`);
     }
 
     const data = await response.json();
-
     if (data.error) {
-      console.error("Error creating recipe:", data.error);
+      console.error(`${errorLabel}:`, data.error);
       throw new Error(`Error ${data.error}`);
     }
 
-    return data as IRecipe[];
+    return {
+      recipes: data as IRecipe[],
+      nextCursor: response.headers.get("X-Next-Cursor"),
+    };
+  };
+
+  fetchAllRecipes = async (after?: string): Promise<IRecipePage> => {
+    const url = `${this.apiUrl}/recipe/graphql/get_recipes`;
+    console.log("Fetching all recipes from:", url);
+
+    // No necesitas headers de auth si devuelves todo
+    return this.fetchPage(url, { method: "GET" }, "Error fetching recipes", after);
   };
 
   fetchRecipe = async (recipe_id: string): Promise<IRecipe> => {
@@ -121,24 +140,18 @@ class RecipeService {
     return data as IRecipe[];
   };
 
-  fetchUserRecipesNA = async (userId: string): Promise<IRecipe[]> => {
+  fetchUserRecipesNA = async (userId: string, after?: string): Promise<IRecipePage> => {
     const url = `${
       this.apiUrl
     }/recipe/graphql/get_recipebyuserNA?user_id=${encodeURIComponent(userId)}`;
     console.log("→ Calling GET", url);
 
-    const response = await fetch(url, {
-      method: "GET",
-      headers: { "Content-Type": "application/json" },
-    });
-
-    if (!response.ok) {
-      const text = await response.text();
-      console.error("Error response:", text);
-      throw new Error(`Error fetching recipes: ${response.status}`);
-    }
-
-    return (await response.json()) as IRecipe[];
+    return this.fetchPage(
+      url,
+      { method: "GET", headers: { "Content-Type": "application/json" } },
+      "Error fetching user recipes",
+      after
+    );
   };
 
   createRecipe = async (
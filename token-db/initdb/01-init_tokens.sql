@@ -6,6 +6,7 @@ SET search_path = recipy;
 CREATE TABLE jwt_tokens (
   id         SERIAL PRIMARY KEY,
   token      TEXT      NOT NULL,
+  jti        TEXT      NOT NULL, -- claim jti del JWT: clave de búsqueda
   user_id INT NOT NULL,
   issued_at  TIMESTAMP NOT NULL DEFAULT NOW(),
   expires_at TIMESTAMP NOT NULL,
@@ -13,4 +14,5 @@ CREATE TABLE jwt_tokens (
 );
 
 CREATE INDEX idx_jwt_tokens_user  ON jwt_tokens(user_id);
-CREATE INDEX idx_jwt_tokens_token ON jwt_tokens(token);
+CREATE UNIQUE INDEX idx_jwt_tokens_jti ON jwt_tokens(jti);
+CREATE INDEX idx_jwt_tokens_expires ON jwt_tokens(expires_at);
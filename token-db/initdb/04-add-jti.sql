@@ -0,0 +1,29 @@
+-- 4. Búsquedas por jti en lugar del JWT completo
+--    El índice B-tree sobre token (cientos de bytes por fila) se sustituye por
+--    uno único sobre jti (36 caracteres) y uno sobre expires_at para la purga
+--    periódica de userauth-ms. Idempotente: en BDs nuevas 01 ya crea todo esto;
+--    en BDs existentes aplicar a mano:
+--      psql -U $TOKEN_DB_USER -d $TOKEN_DB_NAME -f 04-add-jti.sql
+SET search_path = recipy;
+
+ALTER TABLE jwt_tokens ADD COLUMN IF NOT EXISTS jti TEXT;
+
+-- Los expirados sobran: no hace falta migrarlos
+DELETE FROM jwt_tokens
+WHERE expires_at < (NOW() AT TIME ZONE 'UTC');
+
+-- Backfill: jti del payload del JWT (segunda parte, base64url sin relleno)
+UPDATE jwt_tokens
+SET jti = convert_from(
+      decode(
+        rpad(translate(split_part(token, '.', 2), '-_', '+/'),
+             (length(split_part(token, '.', 2)) + 3) / 4 * 4, '='),
+        'base64'),
+      'UTF8')::json ->> 'jti'
+WHERE jti IS NULL;
+
+ALTER TABLE jwt_tokens ALTER COLUMN jti SET NOT NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jwt_tokens_jti     ON jwt_tokens(jti);
+CREATE INDEX        IF NOT EXISTS idx_jwt_tokens_expires ON jwt_tokens(expires_at);
+DROP INDEX IF EXISTS idx_jwt_tokens_token;
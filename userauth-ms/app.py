@@ -1,13 +1,21 @@
 import os
 import sys
+import atexit
 import json
+import time
+import threading
+from contextlib import contextmanager
 import requests
+from http.cookiejar import DefaultCookiePolicy
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from flask import Flask, request, jsonify, abort, make_response
 from flask_cors import CORS
 from datetime import timedelta, datetime
 from auth import hash_password, verify_password
 from dotenv import load_dotenv
 import psycopg2
+from psycopg2 import pool as pg_pool
 from psycopg2.extras import RealDictCursor
 import pika
 from flask_jwt_extended import (
@@ -16,6 +24,7 @@ from flask_jwt_extended import (
     get_jwt_identity,
     JWTManager,
     decode_token,
+    get_jwt,
 )
 import redis
 from werkzeug.middleware.proxy_fix import ProxyFix
@@ -95,115 +104,351 @@ def get_client_ip():
     return request.remote_addr or ""
 
 
-@jwt.token_in_blocklist_loader
-def check_token_binding(jwt_header, jwt_payload):
+# Binding token → IP en Redis: token_ip:{jti} guarda la IP de emisión, o
+# REVOKED si el token se revocó, con TTL = vida restante del JWT. Así tanto
+# los tokens válidos como los revocados se resuelven con un solo GET y
+# token-db solo se consulta cuando la clave no existe (Redis reiniciado,
+# evictado o caído).
+REVOKED = "-"
+
+
+def _binding_key(jti: str) -> str:
+    return f"token_ip:{jti}"
+
+
+def _cache_binding(jti: str, value: str, exp: float) -> None:
+    ttl = int(exp - time.time())
+    if ttl <= 0:
+        return
+    try:
+        redis_client.setex(_binding_key(jti), ttl, value)
+    except Exception:
+        pass  # sin Redis la próxima validación irá a token-db
+
+
+def _issued_ip(jti: str, exp: float):
     """
-    Se dispara en cada petición @jwt_required():
-      - Recupera el jti del payload
-      - Recupera el token completo del header
-      - Consulta la IP del cliente
-      - Comprueba en Redis (cache) o en Postgres la IP ligada al token
-      - Si hay mismatch, elimina el binding en Redis y revoca el token en BD
+    IP ligada al token, REVOKED si fue revocado o no existe en token-db.
     """
-    # Extraemos identificador único del token y token completo
-    print("Validando token con JTI:", jwt_payload["jti"], file=sys.stderr)
-    jti         = jwt_payload["jti"]
-    token       = request.headers.get("Authorization", "").split()[-1]
-    current_ip  = get_client_ip()
-    binding_key = f"token_ip:{jti}"
-
-    # 1) Intento de validación desde Redis (cache) para performance
     try:
-        stored_ip = redis_client.get(binding_key)
+        stored = redis_client.get(_binding_key(jti))
+        if stored:
+            return stored
     except Exception:
-        stored_ip = None  # Si falla Redis, haremos fallback a Postgres
+        pass  # Si falla Redis, hacemos fallback a Postgres
 
-    print("IP almacenada en Redis:", stored_ip, file=sys.stderr)
+    with token_db() as conn, conn.cursor() as cur:
+        cur.execute(
+            "SELECT issued_ip FROM recipy.jwt_tokens WHERE jti = %s;",
+            (jti,)
+        )
+        row = cur.fetchone()
 
-    if stored_ip:
-        # Si Redis devolvió una IP cacheada...
-        if stored_ip != current_ip:
-            # — IP distinta detectada en cache: borramos binding en Redis
-            try:
-                redis_client.delete(binding_key)
-            except Exception:
-                pass
-            # — Y revocamos permanentemente el token en la base de datos
-            _revoke_token_in_db(token)
-            return True  # Token bloqueado
-        # IP en cache coincide con la actual: token válido
-        return False
-
-    # 2) Fallback a Postgres si no había binding en Redis o Redis falló
-    conn = get_token_db_conn()
-    cur  = conn.cursor()
-    cur.execute(
-        "SELECT issued_ip FROM recipy.jwt_tokens WHERE token = %s;",
-        (token,)
-    )
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
+    issued_ip = row[0] if row else REVOKED
+    _cache_binding(jti, issued_ip, exp)
+    return issued_ip
 
-    print("IP emitida en Postgres:", row, file=sys.stderr)
 
-    if not row:
-        # Token no existe o ya fue eliminado → bloqueado
-        return True
+def revoke_token(jti: str, exp: float) -> None:
+    """
+    Revoca el token: lápida en Redis (las siguientes validaciones lo rechazan
+    sin ir a token-db) y borrado del registro en token-db.
+    """
+    _cache_binding(jti, REVOKED, exp)
+    _revoke_token_in_db(jti)
 
-    issued_ip = row[0]
-    if issued_ip == current_ip:
-        # IP coincide según Postgres: volvemos a cachear en Redis con TTL
-        try:
-            ttl_seconds = int(app.config['JWT_ACCESS_TOKEN_EXPIRES'].total_seconds())
-            redis_client.setex(binding_key, ttl_seconds, issued_ip)
-        except Exception:
-            pass
-        return False  # Token válido
 
-    # Si llegamos aquí, mismatch detectado en Postgres:
-    # borramos también cualquier binding residual en Redis
-    try:
-        redis_client.delete(binding_key)
-    except Exception:
-        pass
-    # revocamos el token en la base de datos
-    _revoke_token_in_db(token)
-    return True  # Token bloqueado
+def check_ip_binding(claims: dict, current_ip: str):
+    """
+    Comprueba el binding de IP de un token ya verificado (firma y expiración).
+    Devuelve None si es válido, o el motivo del rechazo; en caso de mismatch
+    revoca el token.
+    """
+    issued_ip = _issued_ip(claims["jti"], claims["exp"])
+    if issued_ip == REVOKED:
+        return "revoked or missing"
+    if issued_ip != current_ip:
+        print(f"IP mismatch para JTI {claims['jti']}: {issued_ip} != {current_ip}", file=sys.stderr)
+        revoke_token(claims["jti"], claims["exp"])
+        return "IP mismatch — token revoked"
+    return None
+
+
+@jwt.token_in_blocklist_loader
+def check_token_binding(jwt_header, jwt_payload):
+    """
+    Se dispara en cada petición @jwt_required():
+      - Consulta la IP del cliente
+      - Comprueba en Redis (cache) o en Postgres la IP ligada al jti del token
+      - Si hay mismatch, revoca el token (Redis y BD)
+    """
+    return check_ip_binding(jwt_payload, get_client_ip()) is not None
 
 
-def _revoke_token_in_db(token: str):
+def _revoke_token_in_db(jti: str):
     """
     Elimina permanentemente el registro del token en Postgres,
     para que futuras validaciones (incluyendo /validate) lo consideren revocado.
     """
     try:
-        conn = get_token_db_conn()
-        cur  = conn.cursor()
-        cur.execute("DELETE FROM recipy.jwt_tokens WHERE token = %s;", (token,))
-        conn.commit()
-        cur.close()
-        conn.close()
+        with token_db() as conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM recipy.jwt_tokens WHERE jti = %s;", (jti,))
     except Exception:
         # Ignoramos errores de revocación en BD
         pass
 
 
-def get_token_db_conn():
+def _token_db_params() -> dict:
     """
-    Conexión a la base de datos de tokens (token-db),
+    Parámetros de conexión a la base de datos de tokens (token-db),
     usando HOST/PORT desde el entorno para que los tests
     (y los contenedores) puedan sobrescribirlos.
     """
-    host = os.getenv("TOKEN_DB_HOST", "token-db")
-    port = int(os.getenv("TOKEN_DB_PORT", 5432))
-    return psycopg2.connect(
-        host=host,
-        port=port,
+    return dict(
+        host=os.getenv("TOKEN_DB_HOST", "token-db"),
+        port=int(os.getenv("TOKEN_DB_PORT", 5432)),
         dbname=os.getenv("TOKEN_DB_NAME"),
         user=os.getenv("TOKEN_DB_USER"),
-        password=os.getenv("TOKEN_DB_PASSWORD")
+        password=os.getenv("TOKEN_DB_PASSWORD"),
+        connect_timeout=int(os.getenv("TOKEN_DB_CONNECT_TIMEOUT", 5)),
+    )
+
+
+# 7) Pool de conexiones a token-db: cada /login, /logout, /validate y cada
+#    petición @jwt_required() reutiliza una conexión abierta en lugar de
+#    pagar el handshake TCP + auth de Postgres
+# OJO: psycopg2 cierra al devolverlas las conexiones que sobran por encima de
+# MIN, así que MIN es también el número de conexiones ociosas que se conservan
+TOKEN_DB_POOL_MIN     = int(os.getenv("TOKEN_DB_POOL_MIN", 4))
+TOKEN_DB_POOL_MAX     = int(os.getenv("TOKEN_DB_POOL_MAX", 10))
+# segundos que un hilo espera por una conexión libre antes de dar error
+TOKEN_DB_POOL_TIMEOUT = float(os.getenv("TOKEN_DB_POOL_TIMEOUT", 5))
+# conexiones ociosas más de N segundos se comprueban con SELECT 1 al sacarlas
+TOKEN_DB_POOL_CHECK_S = float(os.getenv("TOKEN_DB_POOL_CHECK_S", 30))
+
+
+class TokenDBPool:
+    """
+    ThreadedConnectionPool con:
+      - creación perezosa (importar app.py no exige token-db accesible)
+      - semáforo de TOKEN_DB_POOL_MAX huecos: si el pool está agotado el hilo
+        espera hasta TOKEN_DB_POOL_TIMEOUT en vez de recibir PoolError
+      - health check: descarta conexiones cerradas y hace SELECT 1 a las que
+        llevan más de TOKEN_DB_POOL_CHECK_S ociosas (p.ej. tras reiniciar token-db)
+      - las conexiones rotas durante su uso se cierran en vez de devolverse
+    """
+
+    def __init__(self, minconn: int, maxconn: int):
+        self.minconn = min(minconn, maxconn)
+        self.maxconn = maxconn
+        self._pool = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used = {}
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = pg_pool.ThreadedConnectionPool(
+                        self.minconn, self.maxconn, **_token_db_params()
+                    )
+        return self._pool
+
+    def _healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        # recién abierta (sin uso previo) o usada hace poco: nos fiamos
+        if last_used is None or time.monotonic() - last_used < TOKEN_DB_POOL_CHECK_S:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        pool = self._get_pool()
+        # un intento por conexión ociosa del pool + una nueva como mucho
+        for _ in range(self.maxconn + 1):
+            conn = pool.getconn()
+            if self._healthy(conn):
+                return conn
+            print("token-db: descartando conexión rota del pool", file=sys.stderr)
+            self._discard(conn)
+        raise psycopg2.OperationalError("token-db: no hay conexiones sanas")
+
+    def _discard(self, conn):
+        self._last_used.pop(id(conn), None)
+        try:
+            self._pool.putconn(conn, close=True)
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """
+        Presta una conexión: commit al salir, rollback si hay excepción.
+        """
+        if not self._slots.acquire(timeout=TOKEN_DB_POOL_TIMEOUT):
+            raise psycopg2.OperationalError("token-db: pool agotado")
+        conn = None
+        try:
+            conn = self._checkout()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                if not conn.closed:
+                    try:
+                        conn.rollback()
+                    except psycopg2.Error:
+                        pass
+                raise
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # conexión (o servidor) caído: no la devolvemos al pool
+            if conn is not None:
+                self._discard(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                if conn.closed:
+                    self._discard(conn)
+                else:
+                    self._last_used[id(conn)] = time.monotonic()
+                    self._pool.putconn(conn)
+            self._slots.release()
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+                self._last_used.clear()
+
+
+token_db_pool = TokenDBPool(TOKEN_DB_POOL_MIN, TOKEN_DB_POOL_MAX)
+atexit.register(token_db_pool.close)
+
+
+def token_db():
+    """Atajo: `with token_db() as conn:` con una conexión del pool."""
+    return token_db_pool.connection()
+
+
+# 8) Purga periódica de los tokens expirados en token-db, para que la tabla y
+#    sus índices no crezcan sin límite (0 = desactivada)
+TOKEN_PURGE_INTERVAL = int(os.getenv("TOKEN_PURGE_INTERVAL", 3600))
+TOKEN_PURGE_BATCH    = int(os.getenv("TOKEN_PURGE_BATCH", 5000))
+# Clave del advisory lock de Postgres que comparten todas las instancias
+TOKEN_PURGE_LOCK_ID  = 0x7265_6369_7079
+
+
+def purge_expired_tokens() -> int:
+    """
+    Borra por lotes (transacciones cortas, usando idx_jwt_tokens_expires) los
+    tokens ya expirados. expires_at se guarda en UTC sin zona horaria.
+    Si otra instancia ya está purgando (advisory lock ocupado) no hace nada
+    y devuelve 0.
+    """
+    total = 0
+    with token_db() as conn, conn.cursor() as cur:
+        cur.execute("SELECT pg_try_advisory_lock(%s);", (TOKEN_PURGE_LOCK_ID,))
+        if not cur.fetchone()[0]:
+            return 0
+        try:
+            while True:
+                cur.execute(
+                    """
+                    DELETE FROM recipy.jwt_tokens
+                    WHERE id IN (
+                      SELECT id FROM recipy.jwt_tokens
+                      WHERE expires_at < (NOW() AT TIME ZONE 'UTC')
+                      LIMIT %s
+                    );
+                    """,
+                    (TOKEN_PURGE_BATCH,)
+                )
+                deleted = cur.rowcount
+                conn.commit()
+                total += deleted
+                if deleted < TOKEN_PURGE_BATCH:
+                    return total
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            # El lock es de sesión: no lo suelta el commit/rollback, y la
+            # conexión vuelve al pool (si se cae, Postgres lo libera)
+            if not conn.closed:
+                cur.execute("SELECT pg_advisory_unlock(%s);", (TOKEN_PURGE_LOCK_ID,))
+
+
+def _purge_loop():
+    while True:
+        time.sleep(TOKEN_PURGE_INTERVAL)
+        try:
+            purged = purge_expired_tokens()
+            if purged:
+                print(f"token-db: {purged} tokens expirados purgados", file=sys.stderr)
+        except Exception as e:
+            print(f"Error purgando tokens expirados: {e}", file=sys.stderr)
+
+
+_purger_thread = None
+
+
+def start_token_purger():
+    """Arranca el hilo de purga (una sola vez por proceso)."""
+    global _purger_thread
+    if TOKEN_PURGE_INTERVAL > 0 and _purger_thread is None:
+        _purger_thread = threading.Thread(target=_purge_loop, name="token-purger", daemon=True)
+        _purger_thread.start()
+
+
+# 9) Sesión HTTP compartida con PostgREST: conexiones keep-alive reutilizadas
+#    entre peticiones, reintentos con backoff y timeouts
+PGRST_POOL_SIZE       = int(os.getenv("PGRST_POOL_SIZE", 10))
+PGRST_RETRIES         = int(os.getenv("PGRST_RETRIES", 2))
+PGRST_BACKOFF         = float(os.getenv("PGRST_BACKOFF", 0.1))
+PGRST_CONNECT_TIMEOUT = float(os.getenv("PGRST_CONNECT_TIMEOUT", 3))
+PGRST_READ_TIMEOUT    = float(os.getenv("PGRST_READ_TIMEOUT", 10))
+
+
+def _pgrst_session() -> requests.Session:
+    """
+    Session para todos los hilos de Flask: el pool de urllib3 es thread-safe
+    y las peticiones no comparten estado mutable (headers por llamada, sin
+    cookies). Reintentos:
+      - errores de conexión: cualquier método (la petición no llegó a salir)
+      - lectura / 502-503-504: solo GET y HEAD, para no repetir un
+        rpc/register_user o un PATCH que PostgREST ya pudo aplicar
+    """
+    retry = Retry(
+        total=PGRST_RETRIES,
+        backoff_factor=PGRST_BACKOFF,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,          # un único host: userauth-postgrest
+        pool_maxsize=PGRST_POOL_SIZE,
+        max_retries=retry,
     )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+
+pgrst_session = _pgrst_session()
+atexit.register(pgrst_session.close)
 
 
 def pg(path, **kw):
@@ -213,7 +458,8 @@ def pg(path, **kw):
       pg("users", method="POST", headers=..., json=...)
       pg(f"users?username=eq.{u}", headers=...)
     """
-    return requests.request(
+    kw.setdefault("timeout", (PGRST_CONNECT_TIMEOUT, PGRST_READ_TIMEOUT))
+    return pgrst_session.request(
         method=kw.pop("method", "GET"),
         url=f"{PGRST}/{path}",
         **kw
@@ -306,29 +552,24 @@ def login():
     # 2. Crear JWT y guardarlo en token‑db junto con la IP remota
     print("Intnetando crear JWT para el usuario:", user["id"], file=sys.stderr)
     token     = create_access_token(identity=user["id"])
-    exp       = datetime.utcnow() + app.config['JWT_ACCESS_TOKEN_EXPIRES']
+    claims    = decode_token(token)
+    exp       = datetime.utcfromtimestamp(claims["exp"])
     issued_ip = get_client_ip()
     print("IP del cliente:", issued_ip, file=sys.stderr)
 
-    conn = get_token_db_conn()
-    cur  = conn.cursor()
-    cur.execute(
-        """
-        INSERT INTO recipy.jwt_tokens
-          (token, user_id, expires_at, issued_ip)
-        VALUES (%s, %s, %s, %s);
-        """,
-        (token, user["id"], exp, issued_ip)
-    )
-    conn.commit()
-    conn.close()
+    with token_db() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO recipy.jwt_tokens
+              (token, jti, user_id, expires_at, issued_ip)
+            VALUES (%s, %s, %s, %s, %s);
+            """,
+            (token, claims["jti"], user["id"], exp, issued_ip)
+        )
 
-    # 3. Cachear token en Redis con TTL igual a la expiración del JWT
-    try:
-        ttl = int(app.config['JWT_ACCESS_TOKEN_EXPIRES'].total_seconds())
-        redis_client.setex(f"token:{token}", ttl, user["id"])
-    except Exception as e:
-        app.logger.error(f"Error cacheando token en Redis: {e}")
+    # 3. Cachear el binding de IP en Redis con TTL igual a la expiración del
+    #    JWT: /validate y @jwt_required() lo resuelven con un solo GET
+    _cache_binding(claims["jti"], issued_ip, claims["exp"])
 
     return jsonify({"token": token})
 
@@ -432,20 +673,14 @@ def revoked_token_callback(jwt_header, jwt_payload):
 @app.route("/logout", methods=["POST"])
 @jwt_required()
 def logout():
-    token = request.headers.get("Authorization").split()[1]
+    claims = get_jwt()
 
-    # 1. Eliminar de token-db
-    conn = get_token_db_conn()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM recipy.jwt_tokens WHERE token = %s;", (token,))
-    conn.commit()
-    conn.close()
+    # 1. Lápida en Redis: el token deja de validar sin esperar a su expiración
+    _cache_binding(claims["jti"], REVOKED, claims["exp"])
 
-    # 2. Eliminar de Redis
-    try:
-        redis_client.delete(f"token:{token}")
-    except Exception as e:
-        app.logger.error(f"Error eliminando token de Redis: {e}")
+    # 2. Eliminar de token-db
+    with token_db() as conn, conn.cursor() as cur:
+        cur.execute("DELETE FROM recipy.jwt_tokens WHERE jti = %s;", (claims["jti"],))
 
     return jsonify({"msg": "Logged out"}), 200
 
@@ -454,7 +689,8 @@ def logout():
 def validate():
     """
     Endpoint para validar un token JWT y su binding de IP.
-    Cada Response expone un método .json() para que los tests que hacen r.json() pasen.
+    Camino rápido: firma y expiración en local + un GET a Redis por jti;
+    token-db solo se consulta si Redis no tiene el binding.
     """
     # Extraemos el token del header Authorization (Bearer <token>)
     token = request.headers.get("Authorization", "").split("Bearer ")[-1]
@@ -474,84 +710,16 @@ def validate():
             401
         )
 
-    # Obtenemos la IP del cliente (función propia)
-    current_ip = get_client_ip()
-    cache_key  = f"token:{token}"
-
-    # -------------------------------------------------------------------------
-    # 2a) Intento rápido en Redis: si ya estaba cacheado, renovamos TTL y OK
-    # -------------------------------------------------------------------------
-    # 2a) intento rápido en Redis: comprueba token y binding de IP
-    try:
-        ttl = int(app.config['JWT_ACCESS_TOKEN_EXPIRES'].total_seconds())
-        if redis_client.exists(cache_key):
-            # extraer el JTI del token actual
-            claims = get_jwt()
-            jti = claims["jti"]
-            binding_key = f"token_ip:{jti}"
-            stored_ip = redis_client.get(binding_key)
-            current_ip = get_client_ip()
-
-            if stored_ip == current_ip:
-                # renovamos ambos TTL
-                redis_client.expire(cache_key, ttl)
-                redis_client.expire(binding_key, ttl)
-                resp = make_response(
-                    jsonify({"valid": True, "user_id": user_id}),
-                    200
-                )
-                resp.json = lambda: resp.get_json()
-                return resp
-            # mismatch de IP → revocamos
-            resp = make_response(
-                jsonify({"valid": False, "error": "IP mismatch — token revoked"}),
-                401
-            )
-            resp.json = lambda: resp.get_json()
-            return resp
-    except Exception:
-        # si falla Redis, caemos al fallback de Postgres
-        pass
-
     # -------------------------------------------------------------------------
-    # 2b) Fallback a token‑db: comprobamos que el token aún exista en la tabla
+    # 2) Binding de IP (Redis y, si falta, token-db); mismatch → revocado
     # -------------------------------------------------------------------------
-    conn = get_token_db_conn()
-    cur  = conn.cursor()
-    cur.execute(
-        "SELECT issued_ip FROM recipy.jwt_tokens WHERE token = %s;",
-        (token,)
-    )
-    row = cur.fetchone()
-    conn.close()
-
-    if not row:
-        # Token revocado o nunca existió
-        return make_response(
-            jsonify({"valid": False, "error": "revoked or missing"}),
-            401
-        )
-
-    # -------------------------------------------------------------------------
-    # 2c) Verificación del binding de IP
-    # -------------------------------------------------------------------------
-    issued_ip = row[0]
-    if current_ip != issued_ip:
-        # Cambio brusco de IP → revocamos el token
+    error = check_ip_binding(claims, get_client_ip())
+    if error:
         return make_response(
-            jsonify({"valid": False, "error": "IP mismatch — token revoked"}),
+            jsonify({"valid": False, "error": error}),
             401
         )
 
-    # -------------------------------------------------------------------------
-    # 2d) Token válido y IP coincide: recacheamos en Redis (opcional) y OK
-    # -------------------------------------------------------------------------
-    try:
-        redis_client.setex(cache_key, ttl, user_id)
-    except Exception:
-        # Ignoramos fallos de Redis
-        pass
-
     return make_response(
         jsonify({"valid": True, "user_id": user_id}),
         200
@@ -561,4 +729,9 @@ def validate():
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 5000))
-    app.run(host="0.0.0.0", port=port, debug=True)
+    debug = True
+    # Con debug, el reloader de Werkzeug ejecuta este módulo dos veces: el
+    # proceso que vigila los ficheros y el hijo que sirve (WERKZEUG_RUN_MAIN)
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_token_purger()
+    app.run(host="0.0.0.0", port=port, debug=debug)